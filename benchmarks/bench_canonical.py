@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark URL canonicalization over a large synthetic URL set.
+
+Generates recipe URLs with the variations seen in real traffic (tracking
+parameters, fragments, www., http/https, trailing slashes, AMP and print
+variants) and reports throughput for the uncached canonicalizer and the
+cached ``canonicalize_url`` entry point, plus how many distinct keys remain.
+
+Usage:
+    python benchmarks/bench_canonical.py [--count 1000000] [--recipes 50000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from canonical import canonicalize_url, canonicalizer  # noqa: E402
+
+DOMAINS = [
+    "allrecipes.com", "foodnetwork.com", "bbcgoodfood.com", "seriouseats.com",
+    "bonappetit.com", "cooking.nytimes.com", "delish.com", "epicurious.com",
+    "simplyrecipes.com", "food.com", "tasteofhome.com", "budgetbytes.com",
+]
+TRACKING = [
+    "", "utm_source=facebook&utm_medium=social", "fbclid=IwAR0abc123",
+    "gclid=Cj0KCQ", "utm_campaign=newsletter&mc_cid=123&mc_eid=456", "ref=pinterest",
+]
+
+
+def make_urls(count: int, recipes: int, seed: int = 42):
+    rng = random.Random(seed)
+    bases = [
+        (rng.choice(DOMAINS), f"/recipe/{rng.randint(1000, 999999)}/dish-{i}")
+        for i in range(recipes)
+    ]
+    urls = []
+    for _ in range(count):
+        domain, path = rng.choice(bases)
+        scheme = rng.choice(("http", "https", "https"))
+        host = domain if rng.random() < 0.5 or domain.count(".") > 1 else f"www.{domain}"
+        variant = rng.random()
+        if variant < 0.05:
+            path = f"{path}/amp"
+        elif variant < 0.08:
+            path = f"{path}/print"
+        if rng.random() < 0.5:
+            path += "/"
+        query = rng.choice(TRACKING)
+        fragment = "#recipe" if rng.random() < 0.2 else ""
+        urls.append(f"{scheme}://{host}{path}{'?' + query if query else ''}{fragment}")
+    return urls
+
+
+def run(label: str, func, urls) -> set:
+    start = time.perf_counter()
+    keys = set(func(url) for url in urls)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<28} {len(urls):>9,} urls  {elapsed:7.2f}s  "
+        f"{len(urls) / elapsed:>11,.0f} urls/s  {elapsed / len(urls) * 1e6:6.2f} us/url"
+    )
+    return keys
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1_000_000, help="number of URLs to canonicalize")
+    parser.add_argument("--recipes", type=int, default=50_000, help="number of distinct recipes behind them")
+    args = parser.parse_args()
+
+    print(f"Generating {args.count:,} URLs for {args.recipes:,} recipes...")
+    urls = make_urls(args.count, args.recipes)
+    raw_distinct = len(set(urls))
+
+    keys = run("uncached canonicalize()", canonicalizer.canonicalize, urls)
+    canonicalize_url.cache_clear()
+    run("canonicalize_url (LRU)", canonicalize_url, urls)
+
+    print(f"Distinct raw URLs:       {raw_distinct:,}")
+    print(f"Distinct canonical keys: {len(keys):,} (recipes: {args.recipes:,})")
+    print(f"Cache info:              {canonicalize_url.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark the streaming JSON-LD extractor against the previous regex scan.
+
+By default builds a synthetic corpus of 1MB+ recipe pages shaped like real
+ones: large inline scripts and ad markup, several ld+json blocks, and the
+Recipe either standalone, in a top-level array or inside an ``@graph``,
+placed in ``<head>`` or at the end of ``<body>``.
+Pass ``--dir`` to benchmark a directory of saved ``.html`` pages instead.
+
+Usage:
+    python benchmarks/bench_jsonld.py [--pages 50] [--size-kb 1500] [--dir pages/]
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from jsonld import extract_recipe_json_ld  # noqa: E402
+
+RECIPE = {
+    "@type": "Recipe",
+    "name": "Chewy Chocolate Chip Cookies",
+    "recipeIngredient": ["2 cups flour", "1 cup butter", "1 cup chocolate chips"],
+    "recipeInstructions": [{"@type": "HowToStep", "text": "Mix."}, {"@type": "HowToStep", "text": "Bake."}],
+    "recipeYield": ["24", "24 cookies"],
+    "totalTime": "PT45M",
+}
+
+
+def regex_extract(html_content):
+    """The regex scan previously inlined in parse_recipe"""
+    json_ld_data = None
+    json_ld_pattern = r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>'
+    json_ld_matches = re.findall(json_ld_pattern, html_content, re.DOTALL | re.IGNORECASE)
+    for match in json_ld_matches:
+        try:
+            data = json.loads(match)
+            if isinstance(data, list):
+                for item in data:
+                    if '@type' in item and ('Recipe' in item.get('@type', []) if isinstance(item.get('@type'), list) else item.get('@type') == 'Recipe'):
+                        json_ld_data = item
+                        break
+            elif '@type' in data and ('Recipe' in data.get('@type', []) if isinstance(data.get('@type'), list) else data.get('@type') == 'Recipe'):
+                json_ld_data = data
+            if json_ld_data:
+                break
+        except json.JSONDecodeError:
+            continue
+    return json_ld_data
+
+
+def make_page(rng, size_kb):
+    layout = rng.choice(("standalone", "array", "graph"))
+    recipe = dict(RECIPE, **{"@context": "https://schema.org"})
+    if layout == "array":
+        recipe_block = [{"@context": "https://schema.org", "@type": "WebSite", "name": "x"}, recipe]
+    elif layout == "graph":
+        recipe_block = {"@context": "https://schema.org", "@graph": [
+            {"@type": "WebPage", "name": "x"},
+            {"@type": "BreadcrumbList", "itemListElement": []},
+            dict(RECIPE, **{"@type": ["Recipe"]}),
+        ]}
+    else:
+        recipe_block = recipe
+
+    inline_js = "var ads = [" + ",".join(f'"<div class=ad{i}>slot</div>"' for i in range(200)) + "];\n"
+    recipe_script = f'<script type="application/ld+json">{json.dumps(recipe_block)}</script>'
+    # Half the pages carry the Recipe in <head>, the rest at the end of <body>
+    in_head = rng.random() < 0.5
+    head = [
+        "<!DOCTYPE html><html><head><title>Cookies</title>",
+        '<script type="application/ld+json">{"@context":"https://schema.org","@type":"Organization","name":"x"}</script>',
+        recipe_script if in_head else "",
+    ]
+    body = []
+    size = sum(len(part) for part in head)
+    while size < size_kb * 1024:
+        chunk = f"<script>{inline_js}</script><div class='ad'><p>{'lorem ipsum ' * 200}</p></div>"
+        body.append(chunk)
+        size += len(chunk)
+    tail = "" if in_head else recipe_script
+    return "".join(head) + "</head><body>" + "".join(body) + tail + "</body></html>"
+
+
+def load_corpus(args):
+    if args.dir:
+        pages = []
+        for name in sorted(os.listdir(args.dir)):
+            if name.endswith((".html", ".htm")):
+                with open(os.path.join(args.dir, name), encoding="utf-8", errors="replace") as f:
+                    pages.append(f.read())
+        return pages
+    rng = random.Random(42)
+    return [make_page(rng, args.size_kb) for _ in range(args.pages)]
+
+
+def run(label, func, pages, repeat):
+    found = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        found = sum(1 for page in pages if func(page) is not None)
+    elapsed = (time.perf_counter() - start) / repeat
+    total_mb = sum(len(page) for page in pages) / 1e6
+    print(
+        f"{label:<22} {elapsed * 1000 / len(pages):8.2f} ms/page  "
+        f"{total_mb / elapsed:8.1f} MB/s  recipes found: {found}/{len(pages)}"
+    )
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=50, help="synthetic pages to generate")
+    parser.add_argument("--size-kb", type=int, default=1500, help="approximate size of each synthetic page")
+    parser.add_argument("--dir", help="directory of saved HTML pages to use instead")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = load_corpus(args)
+    if not pages:
+        sys.exit("No pages to benchmark")
+    print(f"Corpus: {len(pages)} pages, average {sum(map(len, pages)) / len(pages) / 1024:,.0f} KB")
+
+    old = run("regex findall", regex_extract, pages, args.repeat)
+    new = run("streaming extractor", extract_recipe_json_ld, pages, args.repeat)
+    print(f"Speed-up: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
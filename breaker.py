@@ -0,0 +1,123 @@
+"""
+Per-domain circuit breakers for outbound fetches.
+
+Each site gets a breaker that starts ``closed``. After
+``BREAKER_FAILURE_THRESHOLD`` consecutive failures (timeouts, connection
+errors, 5xx, or 403/429 blocks) it opens, and fetches to that site fail
+immediately for ``BREAKER_RESET_TIMEOUT`` seconds. It then goes
+``half-open`` and lets ``BREAKER_HALF_OPEN_PROBES`` requests through: a
+success closes it, and a failure opens it again.
+"""
+
+import time
+from typing import Any, Dict, Optional
+
+import config
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of fetching from a site whose breaker is open"""
+
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(f"Circuit open for {host}; retry in {retry_after:.0f}s")
+        self.host = host
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Closed / open / half-open state machine for one site"""
+
+    __slots__ = (
+        "failure_threshold", "reset_timeout", "half_open_probes",
+        "state", "failures", "opened_at", "probes",
+    )
+
+    def __init__(
+        self,
+        failure_threshold: int = config.BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = config.BREAKER_RESET_TIMEOUT,
+        half_open_probes: int = config.BREAKER_HALF_OPEN_PROBES,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether a request may go out now; half-open admits a few probes"""
+        if self.state == OPEN:
+            if self.retry_after() > 0:
+                return False
+            self.state = HALF_OPEN
+            self.probes = 0
+        if self.state == HALF_OPEN:
+            if self.probes >= self.half_open_probes:
+                return False
+            self.probes += 1
+        return True
+
+    def record_success(self) -> None:
+        self.state = CLOSED
+        self.failures = 0
+        self.probes = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self.probes = 0
+
+    def release(self) -> None:
+        """A request finished without a verdict (e.g. it was cancelled)"""
+        if self.state == HALF_OPEN and self.probes > 0:
+            self.probes -= 1
+
+
+class BreakerRegistry:
+    """Circuit breakers keyed by host, created on first use"""
+
+    def __init__(self, failure_threshold: int = config.BREAKER_FAILURE_THRESHOLD):
+        self.failure_threshold = failure_threshold
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.failure_threshold > 0
+
+    def get(self, host: str) -> Optional[CircuitBreaker]:
+        return self._breakers.get(host)
+
+    def acquire(self, host: str) -> Optional[CircuitBreaker]:
+        """Admit a request to ``host`` or raise ``CircuitOpenError``"""
+        if not self.enabled:
+            return None
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = self._breakers[host] = CircuitBreaker(failure_threshold=self.failure_threshold)
+        if not breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError(host, breaker.retry_after())
+        return breaker
+
+    def stats(self) -> Dict[str, Any]:
+        states = {CLOSED: 0, OPEN: 0, HALF_OPEN: 0}
+        for breaker in self._breakers.values():
+            states[breaker.state] += 1
+        return {
+            "hosts": len(self._breakers),
+            "states": states,
+            "open": sorted(host for host, breaker in self._breakers.items() if breaker.state != CLOSED),
+            "rejected": self.rejected,
+        }
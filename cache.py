@@ -0,0 +1,85 @@
+"""
+In-memory cache of parse results keyed on the canonical recipe URL.
+
+Entries younger than the TTL are fresh. Entries past the TTL but within the
+stale window are still served, and the caller is told to refresh them in
+the background (stale-while-revalidate).
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import config
+
+
+class ResultCache:
+    """TTL cache with stale-while-revalidate and hit/miss counters"""
+
+    def __init__(
+        self,
+        ttl: float = config.CACHE_TTL,
+        stale_ttl: float = config.CACHE_STALE_TTL,
+        max_entries: int = config.CACHE_MAX_ENTRIES,
+    ):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, key: str) -> Optional[Tuple[Any, bool]]:
+        """Return ``(value, is_stale)`` for a usable entry, or None on a miss"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, stored_at = entry
+        age = time.monotonic() - stored_at
+        if age > self.ttl + self.stale_ttl:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        if age > self.ttl:
+            self.stale_hits += 1
+            return value, True
+        self.hits += 1
+        return value, False
+
+    def set(self, key: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+result_cache = ResultCache()
+
+# Short-lived record of URLs that just failed, so repeats fail fast
+failure_cache = ResultCache(
+    ttl=config.NEGATIVE_CACHE_TTL,
+    stale_ttl=0,
+    max_entries=config.NEGATIVE_CACHE_MAX_ENTRIES,
+)
@@ -0,0 +1,201 @@
+"""
+URL canonicalization used to build cache and deduplication keys.
+
+Equivalent recipe URLs (tracking parameters, fragments, ``www.``, http vs
+https, trailing slashes, AMP and print variants) map to one canonical form.
+The canonical form is only used as a key; pages are still fetched from the
+URL the client sent.
+
+Per-domain rules can be supplied as a JSON file (``CANONICAL_RULES_FILE``)
+mapping a domain to its overrides, for example::
+
+    {
+        "example.com": {"keep_params": ["id"]},
+        "news.example.org": {"drop_params": ["ref"], "strip_www": false}
+    }
+
+A rule applies to the domain and all of its subdomains.
+"""
+
+import json
+import logging
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+import config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Query parameters that never change which recipe a page shows
+TRACKING_PARAMS = frozenset({
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "twclid",
+    "igshid", "mc_cid", "mc_eid", "_ga", "_gl", "ref", "ref_src", "referrer",
+    "cmpid", "ncid", "soc_src", "soc_trk",
+    "epik", "mbid", "ito", "rdt", "s_kwcid", "spm", "_hsenc", "_hsmi", "hsCtaTracking",
+    "amp", "outputtype", "print", "printview",
+})
+TRACKING_PREFIXES = ("utm_", "pk_", "mtm_", "hsa_", "oly_", "vero_")
+
+# Path segments that mark AMP / printer-friendly variants of a page
+VARIANT_SEGMENTS = frozenset({"amp", "print", "printable", "printview"})
+
+
+class DomainRule:
+    """Canonicalization overrides for one domain"""
+
+    __slots__ = ("keep_params", "drop_params", "strip_www", "strip_trailing_slash")
+
+    def __init__(
+        self,
+        keep_params: Optional[Iterable[str]] = None,
+        drop_params: Iterable[str] = (),
+        strip_www: Optional[bool] = None,
+        strip_trailing_slash: Optional[bool] = None,
+    ):
+        # keep_params is a whitelist: when set, every other parameter is dropped
+        self.keep_params = frozenset(p.lower() for p in keep_params) if keep_params is not None else None
+        self.drop_params = frozenset(p.lower() for p in drop_params)
+        self.strip_www = strip_www
+        self.strip_trailing_slash = strip_trailing_slash
+
+
+class UrlCanonicalizer:
+    """Configurable URL canonicalizer with per-domain rules"""
+
+    def __init__(
+        self,
+        rules: Optional[Dict[str, DomainRule]] = None,
+        drop_params: Iterable[str] = TRACKING_PARAMS,
+        drop_prefixes: Tuple[str, ...] = TRACKING_PREFIXES,
+        strip_www: bool = True,
+        force_https: bool = True,
+        strip_trailing_slash: bool = True,
+    ):
+        self.rules = {domain.lower(): rule for domain, rule in (rules or {}).items()}
+        self.drop_params = frozenset(p.lower() for p in drop_params)
+        self.drop_prefixes = drop_prefixes
+        self.strip_www = strip_www
+        self.force_https = force_https
+        self.strip_trailing_slash = strip_trailing_slash
+
+    def rule_for(self, host: str) -> Optional[DomainRule]:
+        """Find the most specific rule for a host or one of its parent domains"""
+        if not self.rules:
+            return None
+        while host:
+            rule = self.rules.get(host)
+            if rule is not None:
+                return rule
+            _, _, host = host.partition(".")
+        return None
+
+    def _keep_param(self, name: str, rule: Optional[DomainRule]) -> bool:
+        lowered = name.lower()
+        if rule is not None:
+            if rule.keep_params is not None:
+                return lowered in rule.keep_params
+            if lowered in rule.drop_params:
+                return False
+        return lowered not in self.drop_params and not lowered.startswith(self.drop_prefixes)
+
+    def canonicalize(self, url: str) -> str:
+        parts = urlsplit(url.strip())
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or "").lower().rstrip(".")
+        port = parts.port
+
+        if scheme == "http" and self.force_https:
+            scheme = "https"
+            if port == 80:
+                port = None
+
+        if host.startswith("amp."):
+            host = host[4:]
+        bare_host = host[4:] if host.startswith("www.") else host
+        rule = self.rule_for(bare_host)
+
+        strip_www = self.strip_www if rule is None or rule.strip_www is None else rule.strip_www
+        if strip_www:
+            host = bare_host
+        if port and port != DEFAULT_PORTS.get(scheme):
+            host = f"{host}:{port}"
+
+        path = parts.path or "/"
+        lowered_path = path.lower()
+        if "amp" in lowered_path or "print" in lowered_path:
+            path = self._strip_variant(path)
+        strip_slash = (
+            self.strip_trailing_slash if rule is None or rule.strip_trailing_slash is None
+            else rule.strip_trailing_slash
+        )
+        if strip_slash and len(path) > 1 and path.endswith("/"):
+            path = path.rstrip("/") or "/"
+
+        query = parts.query
+        if query:
+            # Filter the raw "name=value" pairs without decoding and
+            # re-encoding them; only the parameter names matter here
+            params = [
+                pair
+                for pair in query.replace(";", "&").split("&")
+                if pair and self._keep_param(pair.partition("=")[0], rule)
+            ]
+            params.sort()
+            query = "&".join(params)
+
+        return urlunsplit((scheme, host, path, query, ""))
+
+    @staticmethod
+    def _strip_variant(path: str) -> str:
+        """Map AMP / print variants of a path back to the article path"""
+        trailing = path.endswith("/")
+        segments = [s for s in path.split("/") if s]
+        if segments and segments[0].lower() == "amp":
+            segments = segments[1:]
+        while segments and segments[-1].lower() in VARIANT_SEGMENTS:
+            segments = segments[:-1]
+        if segments:
+            last = segments[-1]
+            lowered = last.lower()
+            if lowered.endswith(".amp.html"):
+                segments[-1] = last[:-len(".amp.html")] + ".html"
+            elif lowered.endswith(".amp"):
+                segments[-1] = last[:-len(".amp")]
+        new_path = "/" + "/".join(segments)
+        if trailing and segments:
+            new_path += "/"
+        return new_path
+
+
+def load_rules(path: str) -> Dict[str, DomainRule]:
+    """Load per-domain rules from a JSON file"""
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    return {domain: DomainRule(**options) for domain, options in raw.items()}
+
+
+def _default_canonicalizer() -> UrlCanonicalizer:
+    rules: Dict[str, DomainRule] = {}
+    if config.CANONICAL_RULES_FILE:
+        try:
+            rules = load_rules(config.CANONICAL_RULES_FILE)
+        except (OSError, ValueError, TypeError) as e:
+            logger.error(f"Could not load canonicalization rules from {config.CANONICAL_RULES_FILE}: {e}")
+    return UrlCanonicalizer(
+        rules=rules,
+        drop_params=TRACKING_PARAMS | frozenset(config.CANONICAL_EXTRA_DROP_PARAMS),
+        strip_www=config.CANONICAL_STRIP_WWW,
+        force_https=config.CANONICAL_FORCE_HTTPS,
+    )
+
+
+canonicalizer = _default_canonicalizer()
+
+
+@lru_cache(maxsize=65536)
+def canonicalize_url(url: str) -> str:
+    """Return a normalized form of ``url`` so equivalent URLs share one key"""
+    return canonicalizer.canonicalize(url)
@@ -0,0 +1,91 @@
+"""
+Charset detection and decoding for fetched HTML.
+
+Pages are decoded exactly once, using the first of these that names a known
+encoding:
+
+1. the ``charset`` parameter of the Content-Type header
+2. a byte order mark
+3. a ``<meta charset>`` / ``<meta http-equiv="Content-Type">`` declaration
+   in the first ``SNIFF_BYTES`` of the body
+4. UTF-8
+
+Nothing falls back to statistical guessing, so decoding costs one pass over
+the body however large it is. Bytes that don't fit the chosen encoding
+(including a multi-byte character cut off by the size cap) become U+FFFD.
+"""
+
+import codecs
+import re
+from typing import Optional, Tuple
+
+# How much of the body to search for a <meta> charset declaration
+SNIFF_BYTES = 4096
+
+DEFAULT_ENCODING = "utf-8"
+
+# Longest first, so UTF-32 LE isn't mistaken for UTF-16 LE
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+_META_CHARSET = re.compile(rb"<meta[^>]*?charset\s*=\s*[\"']?\s*([a-z0-9_.:-]+)", re.IGNORECASE)
+
+# Browsers decode these labels as windows-1252, and so do pages that use them
+_WINDOWS_1252_ALIASES = frozenset(("iso8859-1", "ascii"))
+
+
+def normalize_charset(label: Optional[str]) -> Optional[str]:
+    """Python codec name for a charset label, or None if it is unknown"""
+    if not label:
+        return None
+    try:
+        name = codecs.lookup(label.strip().strip("\"'")).name
+    except LookupError:
+        return None
+    return "cp1252" if name in _WINDOWS_1252_ALIASES else name
+
+
+def sniff_bom(content: bytes) -> Optional[str]:
+    for bom, encoding in _BOMS:
+        if content.startswith(bom):
+            return encoding
+    return None
+
+
+def sniff_meta_charset(content: bytes) -> Optional[str]:
+    match = _META_CHARSET.search(content, 0, SNIFF_BYTES)
+    if match is None:
+        return None
+    encoding = normalize_charset(match.group(1).decode("ascii"))
+    # A page that can declare its charset in ASCII isn't UTF-16/32
+    if encoding is not None and encoding.startswith(("utf-16", "utf-32")):
+        return DEFAULT_ENCODING
+    return encoding
+
+
+def detect_charset(content: bytes, declared: Optional[str] = None) -> Tuple[str, str]:
+    """``(encoding, source)`` for a body; source is header, bom, meta or default"""
+    encoding = normalize_charset(declared)
+    if encoding is not None:
+        # A UTF-8 BOM is still stripped when the header agrees with it
+        if encoding == "utf-8" and content.startswith(codecs.BOM_UTF8):
+            return "utf-8-sig", "header"
+        return encoding, "header"
+    encoding = sniff_bom(content)
+    if encoding is not None:
+        return encoding, "bom"
+    encoding = sniff_meta_charset(content)
+    if encoding is not None:
+        return encoding, "meta"
+    return DEFAULT_ENCODING, "default"
+
+
+def decode_html(content: bytes, declared: Optional[str] = None) -> Tuple[str, str, str]:
+    """Decode a body once; returns ``(text, encoding, source)``"""
+    encoding, source = detect_charset(content, declared)
+    return content.decode(encoding, errors="replace"), encoding, source
@@ -0,0 +1,138 @@
+"""
+Runtime configuration for the Dishly.pro Recipe Parser API.
+
+All settings are read from environment variables (a local ``.env`` file is
+honoured) so the same image can be tuned per deployment.
+"""
+
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def _env_list(name: str) -> list:
+    value = os.getenv(name, "")
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+# Outbound HTTP client
+HTTP_TIMEOUT = _env_float("HTTP_TIMEOUT", 30.0)
+HTTP_MAX_CONNECTIONS = _env_int("HTTP_MAX_CONNECTIONS", 200)
+HTTP_MAX_KEEPALIVE_CONNECTIONS = _env_int("HTTP_MAX_KEEPALIVE_CONNECTIONS", 50)
+HTTP_KEEPALIVE_EXPIRY = _env_float("HTTP_KEEPALIVE_EXPIRY", 30.0)
+HTTP_MAX_CONNECTIONS_PER_HOST = _env_int("HTTP_MAX_CONNECTIONS_PER_HOST", 8)
+# Domains fetched over HTTP/2 where the site supports it (subdomains
+# included); "*" for every site. Others use HTTP/1.1.
+HTTP2_DOMAINS = _env_list("HTTP2_DOMAINS")
+# Retries of transient fetch failures, with jittered exponential backoff
+HTTP_RETRIES = _env_int("HTTP_RETRIES", 2)
+HTTP_RETRY_BACKOFF = _env_float("HTTP_RETRY_BACKOFF", 0.5)
+HTTP_RETRY_BACKOFF_MAX = _env_float("HTTP_RETRY_BACKOFF_MAX", 5.0)
+# Overall budget for fetching one page, including waits and retries
+HTTP_REQUEST_DEADLINE = _env_float("HTTP_REQUEST_DEADLINE", 30.0)
+# In-process DNS cache for outbound fetches; record TTLs are clamped to
+# [DNS_CACHE_MIN_TTL, DNS_CACHE_MAX_TTL], DNS_CACHE_TTL applies when the
+# resolver reports none, and failed lookups are kept for DNS_NEGATIVE_TTL
+DNS_CACHE_ENABLED = _env_bool("DNS_CACHE_ENABLED", True)
+DNS_CACHE_MAX_ENTRIES = _env_int("DNS_CACHE_MAX_ENTRIES", 4096)
+DNS_CACHE_TTL = _env_float("DNS_CACHE_TTL", 300.0)
+DNS_CACHE_MIN_TTL = _env_float("DNS_CACHE_MIN_TTL", 5.0)
+DNS_CACHE_MAX_TTL = _env_float("DNS_CACHE_MAX_TTL", 3600.0)
+DNS_NEGATIVE_TTL = _env_float("DNS_NEGATIVE_TTL", 30.0)
+# Hedged requests: re-send a request whose headers are slower than the host's
+# usual p95, within a global budget of HEDGE_BUDGET_RATIO of all requests
+HEDGE_ENABLED = _env_bool("HEDGE_ENABLED", False)
+HEDGE_PERCENTILE = _env_float("HEDGE_PERCENTILE", 0.95)
+HEDGE_BUDGET_RATIO = _env_float("HEDGE_BUDGET_RATIO", 0.05)
+HEDGE_BUDGET_BURST = _env_float("HEDGE_BUDGET_BURST", 10.0)
+HEDGE_MIN_SAMPLES = _env_int("HEDGE_MIN_SAMPLES", 20)
+HEDGE_WINDOW = _env_int("HEDGE_WINDOW", 200)
+# Hosts whose latency is tracked; the least recently fetched are forgotten
+HEDGE_MAX_HOSTS = _env_int("HEDGE_MAX_HOSTS", 1000)
+# Requests per second started against one host (0 for no limit), with bursts
+# of up to HTTP_HOST_BURST; HTTP_HOST_RATE_OVERRIDES sets per-host rates as
+# "allrecipes.com=2,example.com=0.5"
+HTTP_HOST_RATE = _env_float("HTTP_HOST_RATE", 4.0)
+HTTP_HOST_BURST = _env_int("HTTP_HOST_BURST", 8)
+HTTP_HOST_RATE_OVERRIDES = _env_list("HTTP_HOST_RATE_OVERRIDES")
+# Largest page body read, in bytes (0 for no limit)
+HTTP_MAX_BODY_BYTES = _env_int("HTTP_MAX_BODY_BYTES", 10 * 1024 * 1024)
+# Stop downloading once <head> and a usable JSON-LD Recipe have arrived
+HTTP_EARLY_STOP = _env_bool("HTTP_EARLY_STOP", True)
+
+# HTML parsing
+PARSE_WORKERS = _env_int("PARSE_WORKERS", os.cpu_count() or 1)
+
+# Parse result cache
+CACHE_TTL = _env_float("CACHE_TTL", 3600.0)
+CACHE_STALE_TTL = _env_float("CACHE_STALE_TTL", 86400.0)
+CACHE_MAX_ENTRIES = _env_int("CACHE_MAX_ENTRIES", 10000)
+
+# Recipe storage (0 disables a bound)
+RECIPE_STORE_MAX_ENTRIES = _env_int("RECIPE_STORE_MAX_ENTRIES", 5000)
+RECIPE_STORE_MAX_BYTES = _env_int("RECIPE_STORE_MAX_BYTES", 64 * 1024 * 1024)
+RECIPE_STORE_BACKEND = os.getenv("RECIPE_STORE_BACKEND", "memory").lower()
+RECIPE_STORE_PATH = os.getenv("RECIPE_STORE_PATH", "dishly_recipes.db")
+RECIPE_STORE_BATCH_SIZE = _env_int("RECIPE_STORE_BATCH_SIZE", 100)
+RECIPE_STORE_FLUSH_INTERVAL = _env_float("RECIPE_STORE_FLUSH_INTERVAL", 0.05)
+
+# Recipe ids: hash of the canonical URL, optionally combined with a content hash
+RECIPE_ID_INCLUDE_CONTENT = _env_bool("RECIPE_ID_INCLUDE_CONTENT", False)
+
+# URL canonicalization for cache / dedup keys
+CANONICAL_STRIP_WWW = _env_bool("CANONICAL_STRIP_WWW", True)
+CANONICAL_FORCE_HTTPS = _env_bool("CANONICAL_FORCE_HTTPS", True)
+CANONICAL_EXTRA_DROP_PARAMS = _env_list("CANONICAL_EXTRA_DROP_PARAMS")
+CANONICAL_RULES_FILE = os.getenv("CANONICAL_RULES_FILE", "")
+
+# Batch parsing
+BATCH_MAX_URLS = _env_int("BATCH_MAX_URLS", 200)
+BATCH_CONCURRENCY = _env_int("BATCH_CONCURRENCY", 32)
+BATCH_PER_DOMAIN_CONCURRENCY = _env_int("BATCH_PER_DOMAIN_CONCURRENCY", 4)
+
+# Asynchronous parse jobs
+JOB_WORKERS = _env_int("JOB_WORKERS", 8)
+JOB_QUEUE_BACKEND = os.getenv("JOB_QUEUE_BACKEND", "memory").lower()
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "dishly_jobs.db")
+JOB_POLL_INTERVAL = _env_float("JOB_POLL_INTERVAL", 0.5)
+JOB_LEASE_TIMEOUT = _env_float("JOB_LEASE_TIMEOUT", 300.0)
+JOB_RETENTION = _env_int("JOB_RETENTION", 10000)
+JOB_RETENTION_SECONDS = _env_float("JOB_RETENTION_SECONDS", 86400.0)
+JOB_EVENTS_HEARTBEAT = _env_float("JOB_EVENTS_HEARTBEAT", 15.0)
+
+# Build recipes straight from complete JSON-LD, skipping recipe-scrapers
+JSONLD_FAST_PATH = _env_bool("JSONLD_FAST_PATH", True)
+
+# On-disk snapshots of fetched pages (disabled unless SNAPSHOT_DIR is set)
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "")
+SNAPSHOT_MAX_BYTES = _env_int("SNAPSHOT_MAX_BYTES", 1024 * 1024 * 1024)
+# Snapshots younger than this are parsed instead of re-downloading (0: always fetch)
+SNAPSHOT_MAX_AGE = _env_float("SNAPSHOT_MAX_AGE", 86400.0)
+SNAPSHOT_ZSTD_LEVEL = _env_int("SNAPSHOT_ZSTD_LEVEL", 10)
+
+# Per-domain circuit breaker (threshold 0 disables it)
+BREAKER_FAILURE_THRESHOLD = _env_int("BREAKER_FAILURE_THRESHOLD", 5)
+BREAKER_RESET_TIMEOUT = _env_float("BREAKER_RESET_TIMEOUT", 30.0)
+BREAKER_HALF_OPEN_PROBES = _env_int("BREAKER_HALF_OPEN_PROBES", 1)
+
+# Recently failed URLs are answered from memory for this long (0 disables)
+NEGATIVE_CACHE_TTL = _env_float("NEGATIVE_CACHE_TTL", 60.0)
+NEGATIVE_CACHE_MAX_ENTRIES = _env_int("NEGATIVE_CACHE_MAX_ENTRIES", 10000)
@@ -0,0 +1,109 @@
+"""
+Progress events for asynchronous parse jobs, streamed over Server-Sent Events.
+
+Each job has an event log (``queued``, ``fetching``, ``fetched`` or
+``not-modified``, ``parsing``, ``json-ld-fallback``, ``done`` / ``failed``) with per-stage timings. The
+fetch/parse code publishes stages per canonical URL; jobs watching that URL
+record them, which also covers jobs that joined another job's in-flight
+parse. Subscribers get the log so far and then live events until the job
+finishes.
+"""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+import config
+
+TERMINAL_STAGES = ("done", "failed")
+
+
+class JobEvents:
+    """Per-job event logs with live subscribers"""
+
+    def __init__(self, retention: int = config.JOB_RETENTION):
+        self.retention = retention
+        self._logs: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._url_watchers: Dict[str, Set[str]] = {}
+
+    def emit(self, job_id: str, stage: str, **data: Any) -> None:
+        log = self._logs.get(job_id)
+        if log is None:
+            log = self._logs[job_id] = []
+            while len(self._logs) > self.retention:
+                self._logs.popitem(last=False)
+        now = time.time()
+        event = {
+            "job_id": job_id,
+            "stage": stage,
+            "timestamp": now,
+            "stage_ms": round((now - log[-1]["timestamp"]) * 1000, 1) if log else 0.0,
+            "elapsed_ms": round((now - log[0]["timestamp"]) * 1000, 1) if log else 0.0,
+        }
+        event.update(data)
+        log.append(event)
+        for queue in self._subscribers.get(job_id, ()):
+            queue.put_nowait(event)
+
+    def watch_url(self, canonical_url: str, job_id: str) -> None:
+        self._url_watchers.setdefault(canonical_url, set()).add(job_id)
+
+    def unwatch_url(self, canonical_url: str, job_id: str) -> None:
+        watchers = self._url_watchers.get(canonical_url)
+        if watchers is not None:
+            watchers.discard(job_id)
+            if not watchers:
+                del self._url_watchers[canonical_url]
+
+    def emit_for_url(self, canonical_url: str, stage: str, **data: Any) -> None:
+        """Record a stage for every job currently waiting on this URL"""
+        for job_id in tuple(self._url_watchers.get(canonical_url, ())):
+            self.emit(job_id, stage, **data)
+
+    def history(self, job_id: str) -> List[Dict[str, Any]]:
+        return list(self._logs.get(job_id, ()))
+
+    async def subscribe(
+        self,
+        job_id: str,
+        poll_interval: float = config.JOB_EVENTS_HEARTBEAT,
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Yield the job's events so far, then live ones until a terminal stage.
+
+        ``None`` is yielded every ``poll_interval`` seconds without events so
+        the caller can send a keep-alive or check the job's persisted status
+        (the job may be running in another process).
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        try:
+            for event in self.history(job_id):
+                yield event
+                if event["stage"] in TERMINAL_STAGES:
+                    return
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=poll_interval)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                yield event
+                if event["stage"] in TERMINAL_STAGES:
+                    return
+        finally:
+            subscribers = self._subscribers.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[job_id]
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    return f"event: {event['stage']}\ndata: {json.dumps(event)}\n\n"
+
+
+job_events = JobEvents()
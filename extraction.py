@@ -0,0 +1,553 @@
+"""
+Recipe field extraction.
+
+Parsing HTML with recipe-scrapers (lxml/BeautifulSoup) is CPU-bound, so it
+runs in a pre-warmed pool of worker processes instead of on the event loop.
+Workers receive the raw page bytes plus the source URL, decode them once
+(see ``charset``) and return plain dicts: the extracted fields, which map
+directly onto ``RecipeData``, and a note of which strategy produced them.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+from recipe_scrapers import SCRAPERS, SchemaScraperFactory
+from recipe_scrapers._utils import get_host_name
+
+import config
+from charset import decode_html
+from ids import SOURCE_FIELDS
+from jsonld import as_text_list, clean_text, extract_recipe_json_ld, first_text, flatten_instructions
+
+logger = logging.getLogger(__name__)
+
+
+def parse_iso_duration(duration_str):
+    """Parse ISO 8601 duration format (e.g., PT5M) to human-readable format"""
+    if not duration_str:
+        return None
+    match = re.match(r'PT(?:(\d+)H)?(?:(\d+)M)?', duration_str)
+    if match:
+        hours = int(match.group(1) or 0)
+        minutes = int(match.group(2) or 0)
+        total_minutes = hours * 60 + minutes
+        if total_minutes > 0:
+            return f"{total_minutes} minutes"
+    return None
+
+
+def map_nutrients(nutrients: Dict[str, Any]) -> Dict[str, Any]:
+    """Map schema.org NutritionInformation keys onto our nutrition keys"""
+    nutrition = {
+        "calories": nutrients.get("calories"),
+        "protein": nutrients.get("proteinContent"),
+        "carbs": nutrients.get("carbohydrateContent"),
+        "fat": nutrients.get("fatContent"),
+        "sugar": nutrients.get("sugarContent"),
+        "sodium": nutrients.get("sodiumContent"),
+        "fiber": nutrients.get("fiberContent"),
+        "cholesterol": nutrients.get("cholesterolContent"),
+        "saturatedFat": nutrients.get("saturatedFatContent")
+    }
+    # Remove None values
+    return {k: v for k, v in nutrition.items() if v is not None}
+
+
+def is_complete_json_ld(recipe: Dict[str, Any]) -> bool:
+    """Whether a JSON-LD Recipe has enough data to skip recipe-scrapers"""
+    return bool(
+        clean_text(recipe.get("name"))
+        and as_text_list(recipe.get("recipeIngredient"))
+        and flatten_instructions(recipe.get("recipeInstructions"))
+    )
+
+
+def fields_from_json_ld(recipe: Dict[str, Any], url: str) -> Dict[str, Any]:
+    """Build ``RecipeData`` fields straight from a JSON-LD Recipe node"""
+    yields = recipe.get("recipeYield")
+    if isinstance(yields, list):
+        yields = yields[-1] if yields else None
+    yields = clean_text(yields)
+    servings = None
+    if yields:
+        match = re.search(r'\d+', yields)
+        if match:
+            servings = int(match.group())
+    
+    rating = recipe.get("aggregateRating")
+    ratings = None
+    ratings_count = None
+    if isinstance(rating, dict):
+        try:
+            ratings = round(float(rating.get("ratingValue")), 2)
+        except (TypeError, ValueError):
+            pass
+        try:
+            ratings_count = int(float(rating.get("ratingCount") or rating.get("reviewCount")))
+        except (TypeError, ValueError):
+            pass
+    
+    keywords = recipe.get("keywords")
+    if isinstance(keywords, str):
+        keywords = [k.strip() for k in keywords.split(",") if k.strip()]
+    keywords = as_text_list(keywords) or None
+    
+    diets = [
+        # "https://schema.org/GlutenFreeDiet" -> "Gluten Free Diet"
+        re.sub(r'(?<=[a-z])(?=[A-Z])', ' ', diet.rsplit("/", 1)[-1])
+        for diet in as_text_list(recipe.get("suitableForDiet"))
+    ] or None
+    
+    nutrition = recipe.get("nutrition")
+    nutrition = map_nutrients(nutrition) if isinstance(nutrition, dict) else {}
+    
+    video = recipe.get("video")
+    video_url = None
+    if isinstance(video, list):
+        video = video[0] if video else None
+    if isinstance(video, dict):
+        video_url = clean_text(video.get("contentUrl") or video.get("embedUrl"))
+    
+    cuisine = as_text_list(recipe.get("recipeCuisine"))
+    category = as_text_list(recipe.get("recipeCategory"))
+    
+    return {
+        "title": clean_text(recipe.get("name")),
+        "description": clean_text(recipe.get("description")),
+        "servings": servings,
+        "yields": yields,
+        "cook_time": parse_iso_duration(recipe.get("cookTime")),
+        "prep_time": parse_iso_duration(recipe.get("prepTime")),
+        "total_time": parse_iso_duration(recipe.get("totalTime")),
+        "ingredients": as_text_list(recipe.get("recipeIngredient")),
+        "instructions": flatten_instructions(recipe.get("recipeInstructions")),
+        "notes": None,
+        "nutrition": nutrition or None,
+        "source_url": url,
+        "source_name": urlparse(url).netloc.replace('www.', ''),
+        "video_url": video_url,
+        "has_video": bool(video_url),
+        "image_url": first_text(recipe.get("image")),
+        "author": first_text(recipe.get("author")),
+        "ratings": ratings,
+        "ratings_count": ratings_count,
+        "cuisine": ", ".join(cuisine) if cuisine else None,
+        "category": ", ".join(category) if category else None,
+        "keywords": keywords,
+        "language": clean_text(recipe.get("inLanguage")),
+        "dietary_restrictions": diets,
+    }
+
+
+def build_scraper(html_content: str, url: str):
+    """
+    Build a single scraper for the page without any network access.
+
+    Supported sites get their site-specific scraper; everything else gets the
+    generic schema.org scraper. Either way the HTML is parsed exactly once.
+    Raises ``ValueError`` for an empty page: recipe-scrapers would otherwise
+    download the URL itself.
+    """
+    if not html_content or html_content.isspace():
+        raise ValueError("Empty page")
+    scraper_class = SCRAPERS.get(get_host_name(url))
+    if scraper_class is None:
+        scraper_class = SchemaScraperFactory.SchemaScraper
+    return scraper_class(url=url, html=html_content)
+
+
+def scraper_field(scraper, name: str):
+    """Call a scraper field, falling back to the scraper's already-parsed schema.org data"""
+    try:
+        return getattr(scraper, name)()
+    except Exception:
+        schema_method = getattr(scraper.schema, name, None)
+        if schema_method is None or not scraper.schema.data:
+            raise
+        return schema_method()
+
+
+def extract_recipe(html_content: str, url: str) -> Dict[str, Any]:
+    """
+    Extract all recipe fields from a downloaded page.
+    
+    Returns ``{"fields": ..., "strategy": ..., "json_ld_fields": [...]}`` where
+    ``fields`` maps onto ``RecipeData`` and the rest describes how they were
+    obtained. ``strategy`` is ``json-ld`` when a complete JSON-LD Recipe was
+    used directly, ``scraper`` when recipe-scrapers supplied every field, and
+    ``json-ld-fallback`` when some fields were filled in from JSON-LD.
+    """
+    # Use recipe-scrapers with the HTML content
+    scraper = None
+    json_ld_fields = []
+    
+    # First, try to extract JSON-LD data
+    json_ld_data = extract_recipe_json_ld(html_content)
+    if json_ld_data:
+        logger.info("Found recipe data in JSON-LD")
+        # Fast path: a complete JSON-LD Recipe needs no DOM parse at all
+        if config.JSONLD_FAST_PATH and is_complete_json_ld(json_ld_data):
+            fields = fields_from_json_ld(json_ld_data, url)
+            return {
+                "fields": fields,
+                "strategy": "json-ld",
+                # source_url / source_name come from the request, not the page
+                "json_ld_fields": [
+                    name for name, value in fields.items()
+                    if value not in (None, [], False) and name not in SOURCE_FIELDS
+                ],
+            }
+    
+    # Parse the document once; site-specific and schema.org lookups both
+    # read from this single scraper instance
+    if not html_content or html_content.isspace():
+        logger.warning(f"Empty page for {url}; using fallback fields")
+    else:
+        try:
+            scraper = build_scraper(html_content, url)
+        except Exception as e:
+            logger.error(f"Could not parse HTML for {url}: {e}")
+            scraper = None
+    
+    # Extract basic recipe information
+    title = None
+    if scraper:
+        try:
+            title = scraper_field(scraper, "title")
+        except Exception as e:
+            logger.warning(f"Could not extract title: {e}")
+    
+    if not title:
+        # Try to extract from URL as fallback
+        url_parts = url.split('/')[-1].replace('-', ' ').replace('_', ' ')
+        title = re.sub(r'\d+', '', url_parts).replace('recipe', '').strip().title()
+        if not title:
+            title = "Recipe from " + urlparse(url).netloc.replace('www.', '')
+    
+    # Extract all available recipe data using recipe-scrapers methods
+    # Get ingredients - try multiple methods
+    ingredients = []
+    if scraper:
+        try:
+            ingredients = scraper_field(scraper, "ingredients")
+            if not ingredients:
+                logger.warning(f"No ingredients found for {url}")
+        except Exception as e:
+            logger.warning(f"Error getting ingredients: {e}")
+    
+    # Fallback to JSON-LD data if available
+    if not ingredients and json_ld_data and 'recipeIngredient' in json_ld_data:
+        ingredients = as_text_list(json_ld_data['recipeIngredient'])
+        json_ld_fields.append("ingredients")
+        logger.info(f"Using ingredients from JSON-LD: {len(ingredients)} items")
+    
+    # Get instructions - try multiple methods
+    instructions = []
+    if scraper:
+        try:
+            # First try to get as list
+            instructions = scraper_field(scraper, "instructions_list")
+        except:
+            try:
+                # Fall back to string instructions
+                instructions_str = scraper_field(scraper, "instructions")
+                if instructions_str:
+                    # Split by common patterns
+                    # Split by numbered steps, double newlines, or periods followed by capital letters
+                    instructions = re.split(r'(?:\d+[.)\s]+|\n\n+|(?<=\.)\s+(?=[A-Z]))', instructions_str)
+                    instructions = [inst.strip() for inst in instructions if inst.strip() and len(inst.strip()) > 10]
+            except Exception as e:
+                logger.warning(f"Error getting instructions: {e}")
+    
+    # Fallback to JSON-LD data if available
+    if not instructions and json_ld_data and 'recipeInstructions' in json_ld_data:
+        instructions = flatten_instructions(json_ld_data['recipeInstructions'])
+        json_ld_fields.append("instructions")
+        logger.info(f"Using instructions from JSON-LD: {len(instructions)} steps")
+    
+    # Don't fail if we can't get all data - just warn
+    if not ingredients:
+        logger.warning(f"No ingredients found for {url}")
+        ingredients = ["Please check the original recipe for ingredients"]
+    if not instructions:
+        logger.warning(f"No instructions found for {url}")
+        instructions = ["Please check the original recipe for instructions"]
+    
+    # Extract ALL available fields from recipe-scrapers
+    # Description
+    description = None
+    if scraper:
+        try:
+            description = scraper_field(scraper, "description")
+        except:
+            pass
+    
+    # Yields/Servings
+    servings = None
+    yields = None
+    if scraper:
+        try:
+            yields = scraper_field(scraper, "yields")
+            if yields:
+                # Extract number from yields string
+                match = re.search(r'\d+', str(yields))
+                if match:
+                    servings = int(match.group())
+        except:
+            pass
+    
+    # Fallback to JSON-LD data
+    if not yields and json_ld_data:
+        if json_ld_data.get('recipeYield'):
+            recipe_yield = json_ld_data['recipeYield']
+            # Often given as a list such as ["4", "4 servings"]
+            if isinstance(recipe_yield, list):
+                recipe_yield = recipe_yield[-1]
+            yields = str(recipe_yield)
+            json_ld_fields.append("yields")
+            match = re.search(r'\d+', yields)
+            if match:
+                servings = int(match.group())
+    
+    # Timing information
+    cook_time = None
+    prep_time = None
+    total_time = None
+    if scraper:
+        try:
+            time_val = scraper_field(scraper, "cook_time")
+            if time_val:
+                cook_time = f"{time_val} minutes" if isinstance(time_val, (int, float)) else str(time_val)
+        except:
+            pass
+        
+        try:
+            time_val = scraper_field(scraper, "prep_time")
+            if time_val:
+                prep_time = f"{time_val} minutes" if isinstance(time_val, (int, float)) else str(time_val)
+        except:
+            pass
+        
+        try:
+            time_val = scraper_field(scraper, "total_time")
+            if time_val:
+                total_time = f"{time_val} minutes" if isinstance(time_val, (int, float)) else str(time_val)
+        except:
+            pass
+    
+    # Fallback to JSON-LD data
+    if json_ld_data:
+        if not prep_time and 'prepTime' in json_ld_data:
+            prep_time = parse_iso_duration(json_ld_data['prepTime'])
+            json_ld_fields.append("prep_time")
+        if not cook_time and 'cookTime' in json_ld_data:
+            cook_time = parse_iso_duration(json_ld_data['cookTime'])
+            json_ld_fields.append("cook_time")
+        if not total_time and 'totalTime' in json_ld_data:
+            total_time = parse_iso_duration(json_ld_data['totalTime'])
+            json_ld_fields.append("total_time")
+    
+    # Nutrition information
+    nutrition = {}
+    if scraper:
+        try:
+            nutrients = scraper_field(scraper, "nutrients")
+            if nutrients:
+                nutrition = map_nutrients(nutrients)
+        except:
+            pass
+    
+    # Media
+    image_url = None
+    video_url = None
+    notes = None
+    author = None
+    ratings = None
+    ratings_count = None
+    cuisine = None
+    category = None
+    keywords = None
+    language = None
+    dietary_restrictions = None
+    
+    if scraper:
+        try:
+            image_url = scraper_field(scraper, "image")
+        except:
+            pass
+        
+        try:
+            video_url = scraper_field(scraper, "video")
+        except:
+            pass
+        
+        try:
+            notes = scraper_field(scraper, "notes")
+        except:
+            pass
+        
+        try:
+            author = scraper_field(scraper, "author")
+        except:
+            pass
+        
+        try:
+            ratings = scraper_field(scraper, "ratings")
+        except:
+            pass
+        try:
+            ratings_count = scraper_field(scraper, "ratings_count")
+        except:
+            pass
+        
+        try:
+            cuisine = scraper_field(scraper, "cuisine")
+        except:
+            pass
+        
+        try:
+            category = scraper_field(scraper, "category")
+        except:
+            pass
+        
+        try:
+            keywords = scraper_field(scraper, "keywords")
+        except:
+            pass
+        
+        try:
+            language = scraper_field(scraper, "language")
+        except:
+            pass
+        
+        try:
+            dietary_restrictions = scraper_field(scraper, "dietary_restrictions")
+        except:
+            pass
+    
+    # Get source information
+    source_name = urlparse(url).netloc.replace('www.', '')
+    fields = {
+        "title": title,
+        "description": description,
+        "servings": servings,
+        "yields": yields,
+        "cook_time": cook_time,
+        "prep_time": prep_time,
+        "total_time": total_time,
+        "ingredients": ingredients,
+        "instructions": instructions,
+        "notes": notes,
+        "nutrition": nutrition if nutrition else None,
+        "source_url": url,
+        "source_name": source_name,
+        "video_url": video_url,
+        "has_video": bool(video_url),
+        "image_url": image_url,
+        "author": author,
+        "ratings": ratings,
+        "ratings_count": ratings_count,
+        "cuisine": cuisine,
+        "category": category,
+        "keywords": keywords,
+        "language": language,
+        "dietary_restrictions": dietary_restrictions,
+    }
+    return {
+        "fields": fields,
+        "strategy": "json-ld-fallback" if json_ld_fields else "scraper",
+        "json_ld_fields": json_ld_fields,
+    }
+
+
+def extract_page(content: bytes, url: str, declared_charset: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Decode a downloaded body and extract its recipe.
+
+    The decoded text is shared by the JSON-LD extractor and the scraper, and
+    the result also reports the ``charset`` used and where it came from.
+    """
+    html_content, charset, charset_source = decode_html(content, declared_charset)
+    extraction = extract_recipe(html_content, url)
+    extraction["charset"] = charset
+    extraction["charset_source"] = charset_source
+    return extraction
+
+
+def _warm_worker() -> None:
+    """Worker initializer: import the heavy parsing stack up front"""
+    logging.basicConfig(level=logging.INFO)
+    import recipe_scrapers  # noqa: F401
+    import bs4  # noqa: F401
+    import extruct  # noqa: F401
+
+
+def _ping() -> bool:
+    return True
+
+
+class ParsePool:
+    """Pre-warmed process pool that runs ``extract_page`` off the event loop"""
+
+    def __init__(self, workers: int = config.PARSE_WORKERS):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    async def start(self) -> None:
+        if self._executor is not None or self.workers <= 0:
+            return
+        self._executor = self._new_executor()
+        # Touch every worker so the first real requests don't pay for
+        # process start-up and imports
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(self._executor, _ping) for _ in range(self.workers)
+        ))
+        logger.info(f"Parse pool started with {self.workers} workers")
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker,
+        )
+
+    def _replace_broken(self, broken: ProcessPoolExecutor) -> None:
+        """Swap in a new pool after a worker died; concurrent callers share one rebuild"""
+        if self._executor is broken:
+            logger.warning("Parse worker died; restarting the parse pool")
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._new_executor()
+
+    async def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            logger.info("Parse pool stopped")
+
+    async def extract(self, content: bytes, url: str, declared_charset: Optional[str] = None) -> Dict[str, Any]:
+        """Decode and extract a page in a worker process; see ``extract_page``"""
+        if self._executor is None:
+            # PARSE_WORKERS=0 (or pool not started): parse on a thread instead
+            return await asyncio.to_thread(extract_page, content, url, declared_charset)
+        loop = asyncio.get_running_loop()
+        # A dead worker (OOM, a crash in lxml) breaks the whole executor, so
+        # rebuild it and give the page one more try on the new pool
+        for attempt in range(2):
+            executor = self._executor
+            try:
+                # Bytes go to the worker as-is, so decoding happens off the event loop too
+                return await loop.run_in_executor(executor, extract_page, content, url, declared_charset)
+            except BrokenProcessPool:
+                self._replace_broken(executor)
+                if attempt:
+                    raise
+
+
+parse_pool = ParsePool()
@@ -0,0 +1,495 @@
+"""
+Shared outbound HTTP client used to download recipe pages.
+
+A single ``httpx.AsyncClient`` is created when the application starts and
+closed on shutdown, so connections are pooled and kept alive across
+requests instead of being set up again for every recipe.
+
+Bodies are streamed rather than buffered: reading stops at
+``HTTP_MAX_BODY_BYTES``, or earlier when the caller's stop check says the
+rest of the page is not needed (e.g. the JSON-LD Recipe has been seen).
+
+Transient failures are retried with jittered exponential backoff, within an
+overall per-page deadline (``HTTP_REQUEST_DEADLINE``) so retries never push a
+request past its latency budget.
+
+Sites listed in ``HTTP2_DOMAINS`` are fetched over HTTP/2 when they offer
+it, multiplexing concurrent requests over one connection per origin.
+
+Requests to each host are capped both in flight (``HTTP_MAX_CONNECTIONS_PER_HOST``)
+and in rate (a token bucket, see ``ratelimit``); the limits are per host, so
+a saturated site never delays fetches from other sites.
+
+Each site has a circuit breaker (see ``breaker``), so a site that keeps
+timing out or blocking us is failed fast instead of tying up a worker for
+the full timeout on every request.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+import config
+from breaker import BreakerRegistry
+from hedging import Hedger
+from ratelimit import HostRateLimiter
+from resolver import CachingNetworkBackend, DNSCache
+
+try:
+    import h2
+except ImportError:  # pragma: no cover - optional dependency
+    h2 = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1'
+}
+
+
+def conditional_headers(etag: Optional[str] = None, last_modified: Optional[str] = None) -> Dict[str, str]:
+    """Request headers that revalidate a previously fetched copy of a page"""
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+class Page:
+    """
+    A downloaded page, possibly cut short by the size cap or an early stop.
+
+    ``content`` stays raw bytes and ``encoding`` is the Content-Type charset,
+    if any; the parse worker decodes the page (``extraction.extract_page``).
+    """
+
+    __slots__ = ("url", "status_code", "headers", "content", "encoding", "truncated", "stopped_early")
+
+    def __init__(
+        self,
+        url: str,
+        status_code: int,
+        headers: httpx.Headers,
+        content: bytes,
+        encoding: Optional[str] = None,
+        truncated: bool = False,
+        stopped_early: bool = False,
+    ):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding
+        self.truncated = truncated
+        self.stopped_early = stopped_early
+
+
+# Status codes that count against a site's breaker: errors and blocks
+BREAKER_STATUS_CODES = frozenset((403, 429))
+
+
+def is_site_failure(error: BaseException) -> bool:
+    """Whether a fetch error says the site, rather than this URL, is in trouble"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status >= 500 or status in BREAKER_STATUS_CODES
+    return isinstance(error, (httpx.TimeoutException, httpx.TransportError))
+
+
+# Transient failures worth another attempt; GETs are idempotent
+RETRY_STATUS_CODES = frozenset((429, 502, 503, 504))
+
+
+def retry_reason(error: BaseException) -> Optional[str]:
+    """Short label for a retryable fetch error, or None if it is final"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return f"http_{status}" if status in RETRY_STATUS_CODES else None
+    if isinstance(error, httpx.TimeoutException):
+        return "timeout"
+    if isinstance(error, (httpx.NetworkError, httpx.RemoteProtocolError)):
+        return "network"
+    return None
+
+
+StopCheck = Callable[[bytearray], bool]
+
+
+def _close_response(task: "asyncio.Future[httpx.Response]") -> None:
+    if not task.cancelled() and task.exception() is None:
+        asyncio.ensure_future(task.result().aclose())
+
+
+def _abandon(task: "asyncio.Future[httpx.Response]") -> None:
+    """Cancel a send we no longer need, closing its response if it still arrives"""
+    task.cancel()
+    task.add_done_callback(_close_response)
+
+
+class Fetcher:
+    """Application-scoped async fetcher with per-host connection limits"""
+
+    def __init__(
+        self,
+        timeout: float = config.HTTP_TIMEOUT,
+        max_connections: int = config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections: int = config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = config.HTTP_KEEPALIVE_EXPIRY,
+        max_connections_per_host: int = config.HTTP_MAX_CONNECTIONS_PER_HOST,
+        max_body_bytes: int = config.HTTP_MAX_BODY_BYTES,
+        max_retries: int = config.HTTP_RETRIES,
+        backoff: float = config.HTTP_RETRY_BACKOFF,
+        backoff_max: float = config.HTTP_RETRY_BACKOFF_MAX,
+        deadline: float = config.HTTP_REQUEST_DEADLINE,
+        http2_domains: Iterable[str] = config.HTTP2_DOMAINS,
+    ):
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.max_connections_per_host = max_connections_per_host
+        self.max_body_bytes = max_body_bytes
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.deadline = deadline
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self.breakers = BreakerRegistry()
+        self.rate_limiter = HostRateLimiter()
+        self.hedger = Hedger()
+        self.dns_cache = DNSCache() if config.DNS_CACHE_ENABLED else None
+        self.http2_domains = list(http2_domains)
+        self.pages = 0
+        self.bytes_read = 0
+        self.stopped_early = 0
+        self.truncated = 0
+        self.not_modified = 0
+        self.http_versions: Dict[str, int] = {}
+        self.retries: Dict[str, int] = {}
+        self.retried_successes = 0
+        self.retries_exhausted = 0
+        self.deadline_exceeded = 0
+
+    def _make_transport(self, http2: bool = False) -> httpx.AsyncHTTPTransport:
+        transport = httpx.AsyncHTTPTransport(limits=self.limits, http2=http2)
+        if self.dns_cache is not None:
+            # httpx 0.25 has no option for this; the pool reads it per connection
+            transport._pool._network_backend = CachingNetworkBackend(self.dns_cache)
+        return transport
+
+    def _http2_mounts(self) -> Dict[str, httpx.AsyncBaseTransport]:
+        """
+        Transports for the domains listed in ``HTTP2_DOMAINS``.
+
+        HTTP/2 is offered via ALPN alongside HTTP/1.1, so a site that does not
+        speak it falls back transparently. One HTTP/2 transport is shared by
+        the listed domains; each origin gets one multiplexed connection.
+        """
+        if not self.http2_domains or "*" in self.http2_domains:
+            return {}
+        transport = self._make_transport(http2=True)
+        mounts: Dict[str, httpx.AsyncBaseTransport] = {}
+        for domain in self.http2_domains:
+            domain = domain.lower().lstrip(".")
+            mounts[f"all://{domain}"] = transport
+            mounts[f"all://*.{domain}"] = transport
+        return mounts
+
+    async def start(self) -> None:
+        if self._client is None:
+            if self.http2_domains and h2 is None:
+                logger.warning("HTTP2_DOMAINS is set but the h2 package is not installed; using HTTP/1.1")
+                self.http2_domains = []
+            self._client = httpx.AsyncClient(
+                headers=DEFAULT_HEADERS,
+                timeout=self.timeout,
+                limits=self.limits,
+                follow_redirects=True,
+                transport=self._make_transport(http2="*" in self.http2_domains),
+                mounts=self._http2_mounts(),
+            )
+            logger.info(
+                f"HTTP client started (max_connections={self.limits.max_connections}, "
+                f"per_host={self.max_connections_per_host}, "
+                f"http2={','.join(self.http2_domains) or 'off'})"
+            )
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("HTTP client closed")
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("Fetcher has not been started")
+        return self._client
+
+    def _slot_for(self, host: str) -> asyncio.Semaphore:
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = asyncio.Semaphore(self.max_connections_per_host)
+            self._host_slots[host] = slot
+        return slot
+
+    async def get(
+        self,
+        url: str,
+        make_stop: Optional[Callable[[], StopCheck]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Page:
+        """
+        Fetch a URL, raising for non-2xx responses before the body is read.
+
+        ``make_stop`` builds a fresh check for each attempt; the check is
+        called with the bytes received so far after each chunk, and returning
+        True ends the download there. When ``headers`` make the request
+        conditional, a 304 comes back as an empty page with ``status_code``
+        304 instead of raising. Raises ``CircuitOpenError`` without sending
+        anything while the site's breaker is open.
+
+        Transient failures (connection errors, timeouts, 429/502/503/504) are
+        retried with jittered exponential backoff while the request is within
+        its ``HTTP_REQUEST_DEADLINE``; the deadline also bounds each attempt.
+        """
+        host = urlparse(url).netloc.lower()
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            sent = asyncio.Event()
+            try:
+                page = await asyncio.wait_for(
+                    self._attempt(url, host, make_stop() if make_stop else None, headers, sent),
+                    timeout=remaining,
+                )
+            except asyncio.TimeoutError:
+                self.deadline_exceeded += 1
+                # The deadline usually beats httpx's own timeout, so a site that
+                # hangs or trickles bytes has to be charged here. Time spent
+                # queued for a slot or rate-limit token is not its fault.
+                breaker = self.breakers.get(host)
+                if breaker is not None and sent.is_set():
+                    breaker.record_failure()
+                raise httpx.TimeoutException(f"Deadline of {self.deadline}s exceeded for {url}")
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None or time.monotonic() + delay >= deadline:
+                    if attempt:
+                        self.retries_exhausted += 1
+                    raise
+                reason = retry_reason(e)
+                self.retries[reason] = self.retries.get(reason, 0) + 1
+                logger.info(f"Retrying {url} in {delay:.2f}s after {reason} (attempt {attempt + 1})")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            if attempt:
+                self.retried_successes += 1
+            return page
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying, or None if the error is final"""
+        if attempt >= self.max_retries or retry_reason(error) is None:
+            return None
+        # Full jitter: uniform over [0, base * 2^attempt], capped
+        delay = random.uniform(0, min(self.backoff_max, self.backoff * (2 ** attempt)))
+        if isinstance(error, httpx.HTTPStatusError):
+            retry_after = error.response.headers.get("retry-after", "")
+            if retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+        return delay
+
+    async def _attempt(
+        self,
+        url: str,
+        host: str,
+        stop: Optional[StopCheck],
+        headers: Optional[Dict[str, str]],
+        sent: asyncio.Event,
+    ) -> Page:
+        """One request, accounted against the host's circuit breaker"""
+        breaker = self.breakers.acquire(host)
+        if breaker is None:
+            return await self._fetch(url, host, stop, headers, sent)
+        try:
+            page = await self._fetch(url, host, stop, headers, sent)
+        except BaseException as e:
+            if is_site_failure(e):
+                breaker.record_failure()
+            elif isinstance(e, httpx.HTTPStatusError):
+                # The site answered; only this URL is bad
+                breaker.record_success()
+            else:
+                breaker.release()
+            raise
+        breaker.record_success()
+        return page
+
+    async def _fetch(
+        self,
+        url: str,
+        host: str,
+        stop: Optional[StopCheck],
+        headers: Optional[Dict[str, str]],
+        sent: asyncio.Event,
+    ) -> Page:
+        async with self._slot_for(host):
+            await self.rate_limiter.wait(host)
+            sent.set()
+            response = await self._send(url, host, headers)
+            try:
+                if response.status_code == 304 and headers:
+                    self.not_modified += 1
+                    return Page(url=str(response.url), status_code=304, headers=response.headers, content=b"")
+                response.raise_for_status()
+                body = bytearray()
+                truncated = stopped_early = False
+                async for chunk in response.aiter_bytes():
+                    body += chunk
+                    if self.max_body_bytes and len(body) > self.max_body_bytes:
+                        del body[self.max_body_bytes:]
+                        truncated = True
+                        break
+                    if stop is not None and stop(body):
+                        stopped_early = True
+                        break
+            finally:
+                await response.aclose()
+
+        self.pages += 1
+        self.bytes_read += len(body)
+        self.http_versions[response.http_version] = self.http_versions.get(response.http_version, 0) + 1
+        if truncated:
+            self.truncated += 1
+            logger.warning(f"Response from {url} exceeded {self.max_body_bytes} bytes; truncated")
+        if stopped_early:
+            self.stopped_early += 1
+        return Page(
+            url=str(response.url),
+            status_code=response.status_code,
+            headers=response.headers,
+            content=bytes(body),
+            encoding=response.charset_encoding,
+            truncated=truncated,
+            stopped_early=stopped_early,
+        )
+
+    async def _send(self, url: str, host: str, headers: Optional[Dict[str, str]]) -> httpx.Response:
+        """
+        Send a GET and return once response headers arrive.
+
+        If the host is slower than its usual p95 to answer, a hedge request is
+        raced against the original (budget and host limits permitting); the loser
+        is cancelled.
+        """
+        started = time.monotonic()
+        delay = self.hedger.delay_for(host)
+        primary = asyncio.ensure_future(
+            self.client.send(self.client.build_request("GET", url, headers=headers), stream=True)
+        )
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait({primary}, timeout=delay)
+                if not done and await self._reserve_hedge(host):
+                    slot = self._slot_for(host)
+                    try:
+                        return await self._race(url, host, headers, primary, started)
+                    finally:
+                        slot.release()
+            response = await primary
+        except BaseException:
+            _abandon(primary)
+            raise
+        self.hedger.record(host, time.monotonic() - started)
+        return response
+
+    async def _reserve_hedge(self, host: str) -> bool:
+        """
+        Take what a hedge needs without waiting: a free connection slot and a
+        rate-limit token for the host, and a hedge from the global budget.
+        On success the caller owns the slot and must release it.
+        """
+        slot = self._slot_for(host)
+        if slot.locked() or not self.rate_limiter.try_acquire(host):
+            self.hedger.host_limited += 1
+            return False
+        if not self.hedger.budget.spend():
+            self.rate_limiter.refund(host)
+            self.hedger.denied += 1
+            return False
+        # Returns at once: the slot was just seen to have room
+        await slot.acquire()
+        return True
+
+    async def _race(
+        self,
+        url: str,
+        host: str,
+        headers: Optional[Dict[str, str]],
+        primary: "asyncio.Future[httpx.Response]",
+        started: float,
+    ) -> httpx.Response:
+        self.hedger.hedged += 1
+        hedge = asyncio.ensure_future(
+            self.client.send(self.client.build_request("GET", url, headers=headers), stream=True)
+        )
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = error or task.exception()
+                        continue
+                    if task is hedge:
+                        self.hedger.hedge_wins += 1
+                    self.hedger.record(host, time.monotonic() - started)
+                    # Anything else that finished in the same tick is a loser
+                    for other in done - {task}:
+                        if other.exception() is None:
+                            await other.result().aclose()
+                    return task.result()
+            raise error
+        finally:
+            for task in pending:
+                _abandon(task)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pages": self.pages,
+            "bytes_read": self.bytes_read,
+            "stopped_early": self.stopped_early,
+            "truncated": self.truncated,
+            "not_modified": self.not_modified,
+            "http_versions": dict(self.http_versions),
+            "retries": dict(self.retries),
+            "retried_successes": self.retried_successes,
+            "retries_exhausted": self.retries_exhausted,
+            "deadline_exceeded": self.deadline_exceeded,
+            "rate_limit": self.rate_limiter.stats(),
+            "hedging": self.hedger.stats(),
+            "dns": self.dns_cache.stats() if self.dns_cache is not None else None,
+            "breakers": self.breakers.stats(),
+        }
+
+
+fetcher = Fetcher()
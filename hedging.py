@@ -0,0 +1,112 @@
+"""
+Hedged requests for origins with erratic latency.
+
+The fetcher records how long each host takes to return response headers.
+When hedging is enabled and a request to a host has not returned headers
+within that host's observed p95 (``HEDGE_PERCENTILE``), a second identical
+request is sent and whichever answers first is used.
+
+Hedges are paid for from a global budget: every request earns
+``HEDGE_BUDGET_RATIO`` of a hedge, so hedges can never exceed that fraction
+of traffic (plus a small burst), however slow the origins get. A hedge also
+needs a free per-host connection slot and an immediately available token
+from the host's rate limiter; without them it is skipped, so hedging never
+takes a host past ``HTTP_MAX_CONNECTIONS_PER_HOST`` or ``HTTP_HOST_RATE``.
+"""
+
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional
+
+import config
+
+
+class LatencyTracker:
+    """Recent time-to-headers samples for the ``max_hosts`` most recently fetched hosts"""
+
+    def __init__(
+        self,
+        window: int = config.HEDGE_WINDOW,
+        min_samples: int = config.HEDGE_MIN_SAMPLES,
+        max_hosts: int = config.HEDGE_MAX_HOSTS,
+    ):
+        self.window = window
+        self.min_samples = min_samples
+        self.max_hosts = max_hosts
+        self._samples: "OrderedDict[str, Deque[float]]" = OrderedDict()
+
+    @property
+    def hosts(self) -> int:
+        return len(self._samples)
+
+    def record(self, host: str, seconds: float) -> None:
+        samples = self._samples.get(host)
+        if samples is None:
+            samples = self._samples[host] = deque(maxlen=self.window)
+            while len(self._samples) > self.max_hosts:
+                self._samples.popitem(last=False)
+        else:
+            self._samples.move_to_end(host)
+        samples.append(seconds)
+
+    def percentile(self, host: str, fraction: float) -> Optional[float]:
+        """The host's latency percentile, or None until enough samples exist"""
+        samples = self._samples.get(host)
+        if samples is None or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class HedgeBudget:
+    """Global allowance of hedged requests, earned as a share of all requests"""
+
+    def __init__(self, ratio: float = config.HEDGE_BUDGET_RATIO, burst: float = config.HEDGE_BUDGET_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = burst
+
+    def earn(self) -> None:
+        self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def spend(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class Hedger:
+    """Decides when to hedge a request, and keeps score"""
+
+    def __init__(self, enabled: bool = config.HEDGE_ENABLED, percentile: float = config.HEDGE_PERCENTILE):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.latency = LatencyTracker()
+        self.budget = HedgeBudget()
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.denied = 0
+        self.host_limited = 0
+
+    def record(self, host: str, seconds: float) -> None:
+        """Note a host's time to headers; skipped while hedging is off"""
+        if self.enabled:
+            self.latency.record(host, seconds)
+
+    def delay_for(self, host: str) -> Optional[float]:
+        """Seconds to wait for headers before hedging, or None to never hedge"""
+        if not self.enabled:
+            return None
+        self.budget.earn()
+        return self.latency.percentile(host, self.percentile)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "hosts_tracked": self.latency.hosts,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "denied_by_budget": self.denied,
+            "denied_by_host_limits": self.host_limited,
+            "budget_tokens": round(self.budget.tokens, 2),
+        }
@@ -0,0 +1,34 @@
+"""
+Deterministic recipe IDs.
+
+A recipe's id is a hash of its canonical URL, so re-parsing the same page
+upserts the stored recipe instead of creating a new copy. When
+``RECIPE_ID_INCLUDE_CONTENT`` is set, a hash of the extracted recipe content
+is mixed in as well, giving each distinct version of a recipe its own id.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+import config
+
+
+# Where the recipe was fetched from, not what it says: the raw request URL
+# differs between visits to the same page (tracking parameters and so on)
+SOURCE_FIELDS = frozenset(("source_url", "source_name"))
+
+
+def content_hash(fields: Dict[str, Any]) -> str:
+    """Stable hash of extracted recipe content, ignoring ``SOURCE_FIELDS``"""
+    content = {name: value for name, value in fields.items() if name not in SOURCE_FIELDS}
+    payload = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def recipe_id_for(canonical_url: str, fields: Optional[Dict[str, Any]] = None) -> str:
+    """Return the recipe id for a canonical URL and, optionally, its content"""
+    key = canonical_url
+    if fields is not None and config.RECIPE_ID_INCLUDE_CONTENT:
+        key = f"{canonical_url}\n{content_hash(fields)}"
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
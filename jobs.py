@@ -0,0 +1,462 @@
+"""
+Asynchronous parse jobs.
+
+``POST /parse?async=true`` enqueues a job and returns its id straight away;
+a pool of worker tasks drains the queue in priority order and clients poll
+``GET /jobs/{job_id}`` for the outcome.
+
+Two queue backends are available, selected with ``JOB_QUEUE_BACKEND``:
+
+* ``memory`` - an in-process priority queue (the default).
+* ``sqlite`` - a table in a shared SQLite file, so queued jobs survive
+  restarts and any worker process on the host can pick them up.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobOutcome(Exception):
+    """Raised by a job handler to fail a job with a client-facing message"""
+
+    def __init__(self, error: str, status_code: int = 400):
+        super().__init__(error)
+        self.error = error
+        self.status_code = status_code
+
+
+class Job:
+    """State of one parse job"""
+
+    __slots__ = (
+        "id", "url", "priority", "status", "created_at", "started_at",
+        "finished_at", "result", "error", "status_code",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        url: str,
+        priority: int = 0,
+        status: str = QUEUED,
+        created_at: Optional[float] = None,
+        started_at: Optional[float] = None,
+        finished_at: Optional[float] = None,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+        status_code: Optional[int] = None,
+    ):
+        self.id = id
+        self.url = url
+        self.priority = priority
+        self.status = status
+        self.created_at = created_at if created_at is not None else time.time()
+        self.started_at = started_at
+        self.finished_at = finished_at
+        self.result = result
+        self.error = error
+        self.status_code = status_code
+
+
+class JobQueue:
+    """Interface shared by the job queue backends"""
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def submit(self, url: str, priority: int = 0) -> Job:
+        raise NotImplementedError
+
+    async def claim(self) -> Job:
+        """Wait for the next queued job and mark it running"""
+        raise NotImplementedError
+
+    async def finish(self, job: Job) -> None:
+        """Persist a job that has reached DONE or FAILED"""
+        raise NotImplementedError
+
+    async def requeue(self, jobs: List[Job]) -> None:
+        """Put jobs interrupted by shutdown back on the queue"""
+
+    def get(self, job_id: str) -> Optional[Job]:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class MemoryJobQueue(JobQueue):
+    """In-process priority queue; finished jobs are kept up to ``retention``"""
+
+    def __init__(self, retention: int = config.JOB_RETENTION):
+        self.retention = retention
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._jobs: Dict[str, Job] = {}
+        self._finished: "OrderedDict[str, None]" = OrderedDict()
+        self._seq = 0
+
+    async def start(self) -> None:
+        # Created here so the queue belongs to the running event loop
+        self._queue = asyncio.PriorityQueue()
+
+    async def submit(self, url: str, priority: int = 0) -> Job:
+        job = Job(id=uuid.uuid4().hex, url=url, priority=priority)
+        self._jobs[job.id] = job
+        self._seq += 1
+        await self._queue.put((priority, self._seq, job.id))
+        return job
+
+    async def claim(self) -> Job:
+        while True:
+            _, _, job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is not None and job.status == QUEUED:
+                job.status = RUNNING
+                job.started_at = time.time()
+                return job
+
+    async def finish(self, job: Job) -> None:
+        self._finished[job.id] = None
+        while len(self._finished) > self.retention:
+            old_id, _ = self._finished.popitem(last=False)
+            self._jobs.pop(old_id, None)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        queued = self._queue.qsize() if self._queue is not None else 0
+        return {"backend": "memory", "queued": queued, "jobs": counts}
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Job queue stored in SQLite and shared by every worker process on a host.
+
+    Jobs are claimed atomically inside an IMMEDIATE transaction by a single
+    poller task per process, and only while a worker is idle to take them.
+    Jobs running at shutdown are put back on the queue.
+    Reads (``get``, ``stats``) use their own connection, so they never wait
+    behind a claim that is waiting for another process's write lock. Jobs left
+    RUNNING for longer than ``lease_timeout`` (a worker died mid-job) are put
+    back on the queue by a sweep that runs at start-up and then periodically,
+    so work is not lost across restarts or crashes.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            priority INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL,
+            result TEXT,
+            error TEXT,
+            status_code INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs (status, priority, created_at);
+    """
+    COLUMNS = Job.__slots__
+
+    def __init__(
+        self,
+        path: str = config.JOB_QUEUE_PATH,
+        poll_interval: float = config.JOB_POLL_INTERVAL,
+        lease_timeout: float = config.JOB_LEASE_TIMEOUT,
+        retention_seconds: float = config.JOB_RETENTION_SECONDS,
+    ):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.lease_timeout = lease_timeout
+        self.retention_seconds = retention_seconds
+        # Expired leases only need catching within a fraction of the lease
+        self.sweep_interval = min(60.0, max(1.0, lease_timeout / 4))
+        self._conn = self._connect()
+        self._conn.executescript(self.SCHEMA)
+        # Reads from the event loop get their own connection; WAL readers
+        # never wait for writers
+        self._reader = self._connect()
+        # Each connection is shared by several threads, so serialize its use
+        self._lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._wanted: Optional[asyncio.Event] = None
+        self._ready: Optional[asyncio.Queue] = None
+        self._waiters = 0
+        self._poller: Optional[asyncio.Task] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    async def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._wanted = asyncio.Event()
+        self._ready = asyncio.Queue()
+        requeued = await asyncio.to_thread(self._requeue_expired)
+        if requeued:
+            logger.info(f"Re-queued {requeued} interrupted jobs")
+        self._poller = asyncio.create_task(self._poll())
+        logger.info(f"SQLite job queue opened at {self.path}")
+
+    async def close(self) -> None:
+        if self._poller is not None:
+            self._poller.cancel()
+            await asyncio.gather(self._poller, return_exceptions=True)
+            self._poller = None
+        # Jobs claimed but never handed to a worker go back on the queue
+        unclaimed = []
+        while self._ready is not None and not self._ready.empty():
+            unclaimed.append(self._ready.get_nowait())
+        await self.requeue(unclaimed)
+        with self._lock:
+            self._conn.close()
+        with self._read_lock:
+            self._reader.close()
+
+    def _execute(self, sql: str, params: tuple = ()) -> int:
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        with self._read_lock:
+            return self._reader.execute(sql, params).fetchall()
+
+    def _row_to_job(self, row) -> Job:
+        values = dict(zip(self.COLUMNS, row))
+        if values["result"] is not None:
+            values["result"] = json.loads(values["result"])
+        return Job(**values)
+
+    async def requeue(self, jobs: List[Job]) -> None:
+        if jobs:
+            await asyncio.to_thread(self._requeue_ids, [job.id for job in jobs])
+
+    def _requeue_ids(self, job_ids: List[str]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE jobs SET status = ?, started_at = NULL WHERE id = ? AND status = ?",
+                [(QUEUED, job_id, RUNNING) for job_id in job_ids],
+            )
+
+    def _requeue_expired(self) -> int:
+        cutoff = time.time() - self.lease_timeout
+        requeued = self._execute(
+            "UPDATE jobs SET status = ?, started_at = NULL WHERE status = ? AND started_at < ?",
+            (QUEUED, RUNNING, cutoff),
+        )
+        if self.retention_seconds > 0:
+            self._execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (DONE, FAILED, time.time() - self.retention_seconds),
+            )
+        return requeued
+
+    async def submit(self, url: str, priority: int = 0) -> Job:
+        job = Job(id=uuid.uuid4().hex, url=url, priority=priority)
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT INTO jobs (id, url, priority, status, created_at) VALUES (?, ?, ?, ?, ?)",
+            (job.id, job.url, job.priority, job.status, job.created_at),
+        )
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    def _claim_next(self) -> Optional[Job]:
+        with self._lock:
+            return self._claim_next_locked()
+
+    def _claim_next_locked(self) -> Optional[Job]:
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE status = ? "
+                "ORDER BY priority, created_at LIMIT 1",
+                (QUEUED,),
+            ).fetchone()
+            if row is None:
+                self._conn.execute("COMMIT")
+                return None
+            job = self._row_to_job(row)
+            job.status = RUNNING
+            job.started_at = time.time()
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ? WHERE id = ?",
+                (job.status, job.started_at, job.id),
+            )
+            self._conn.execute("COMMIT")
+            return job
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    async def claim(self) -> Job:
+        self._waiters += 1
+        self._wanted.set()
+        try:
+            return await self._ready.get()
+        finally:
+            self._waiters -= 1
+
+    async def _sweep(self) -> None:
+        try:
+            requeued = await asyncio.to_thread(self._requeue_expired)
+        except Exception as e:
+            logger.error(f"Could not re-queue expired jobs: {e}")
+            return
+        if requeued:
+            logger.info(f"Re-queued {requeued} jobs whose lease expired")
+
+    async def _poll(self) -> None:
+        """Claim jobs for idle workers; the only task that polls the table"""
+        next_sweep = time.monotonic() + self.sweep_interval
+        while True:
+            if time.monotonic() >= next_sweep:
+                await self._sweep()
+                next_sweep = time.monotonic() + self.sweep_interval
+            # Claim no more than idle workers can take, leaving the rest of
+            # the queue to other processes
+            if self._waiters <= self._ready.qsize():
+                self._wanted.clear()
+                try:
+                    await asyncio.wait_for(self._wanted.wait(), timeout=max(0.0, next_sweep - time.monotonic()))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                job = await asyncio.to_thread(self._claim_next)
+            except Exception as e:
+                logger.error(f"Could not claim a job: {e}")
+                job = None
+            if job is not None:
+                self._ready.put_nowait(job)
+                continue
+            # Other processes may enqueue too, so poll as well as waiting
+            # for local submissions
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def finish(self, job: Job) -> None:
+        await asyncio.to_thread(
+            self._execute,
+            "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ?, status_code = ? WHERE id = ?",
+            (
+                job.status,
+                job.finished_at,
+                json.dumps(job.result) if job.result is not None else None,
+                job.error,
+                job.status_code,
+                job.id,
+            ),
+        )
+
+    def get(self, job_id: str) -> Optional[Job]:
+        rows = self._query(f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,))
+        return self._row_to_job(rows[0]) if rows else None
+
+    def stats(self) -> Dict[str, Any]:
+        counts = dict(self._query("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+        return {"backend": "sqlite", "path": self.path, "queued": counts.get(QUEUED, 0), "jobs": counts}
+
+
+JobHandler = Callable[[Job], Awaitable[Dict[str, Any]]]
+
+
+class JobRunner:
+    """Pool of worker tasks that drain a job queue"""
+
+    def __init__(self, queue: JobQueue, workers: int = config.JOB_WORKERS):
+        self.queue = queue
+        self.workers = workers
+        self._tasks: List[asyncio.Task] = []
+        # Jobs claimed by this process and not yet recorded as finished
+        self._running: Dict[str, Job] = {}
+        self.completed = 0
+        self.failed = 0
+
+    async def start(self, handler: JobHandler) -> None:
+        await self.queue.start()
+        self._tasks = [asyncio.create_task(self._work(handler)) for _ in range(self.workers)]
+        logger.info(f"Job runner started with {self.workers} workers")
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Hand interrupted jobs back rather than leaving them running
+        try:
+            await self.queue.requeue(list(self._running.values()))
+        except Exception as e:
+            logger.error(f"Could not re-queue {len(self._running)} interrupted jobs: {e}")
+        self._running.clear()
+        await self.queue.close()
+
+    async def _work(self, handler: JobHandler) -> None:
+        while True:
+            job = await self.queue.claim()
+            self._running[job.id] = job
+            try:
+                job.result = await handler(job)
+                job.status = DONE
+                self.completed += 1
+            except JobOutcome as e:
+                job.status, job.error, job.status_code = FAILED, e.error, e.status_code
+                self.failed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job {job.id} for {job.url} failed: {e}")
+                job.status, job.error, job.status_code = FAILED, "An unexpected error occurred", 500
+                self.failed += 1
+            job.finished_at = time.time()
+            try:
+                await self.queue.finish(job)
+            except Exception as e:
+                logger.error(f"Could not record result of job {job.id}: {e}")
+            self._running.pop(job.id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.queue.stats()
+        stats.update({"workers": self.workers, "completed": self.completed, "failed": self.failed})
+        return stats
+
+
+def create_job_queue() -> JobQueue:
+    """Build the job queue selected by ``JOB_QUEUE_BACKEND``"""
+    if config.JOB_QUEUE_BACKEND == "sqlite":
+        return SQLiteJobQueue()
+    if config.JOB_QUEUE_BACKEND != "memory":
+        raise ValueError(f"Unknown JOB_QUEUE_BACKEND: {config.JOB_QUEUE_BACKEND}")
+    return MemoryJobQueue()
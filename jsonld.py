@@ -0,0 +1,255 @@
+"""
+Fast JSON-LD Recipe extraction.
+
+Scans ``<script>`` tags in a single forward pass, skipping over the bodies of
+ordinary scripts, decodes only ``application/ld+json`` blocks and stops at
+the first block containing a schema.org Recipe. Recipes are found inside
+``@graph`` containers, top-level arrays, ``mainEntity`` wrappers and typed
+lists, and ``@type`` may be a string, a prefixed IRI or a list.
+"""
+
+import html
+import json
+import logging
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCRIPT_OPEN = re.compile(r"<script\b([^>]*)>", re.IGNORECASE)
+_SCRIPT_CLOSE = re.compile(r"</script\s*>", re.IGNORECASE)
+_LD_JSON_TYPE = re.compile(r"""type\s*=\s*["']?application/ld\+json""", re.IGNORECASE)
+
+# Keys under which schema.org documents nest the entities they describe
+_CONTAINER_KEYS = ("@graph", "mainEntity", "mainEntityOfPage", "itemListElement", "item", "hasPart")
+_MAX_DEPTH = 8
+
+_TAG = re.compile(r"<[^>]+>")
+_WHITESPACE = re.compile(r"\s+")
+
+# Byte-level patterns used while a page is still downloading
+_SCRIPT_OPEN_BYTES = re.compile(rb"<script\b([^>]*)>", re.IGNORECASE)
+_SCRIPT_CLOSE_BYTES = re.compile(rb"</script\s*>", re.IGNORECASE)
+_LD_JSON_TYPE_BYTES = re.compile(rb"""type\s*=\s*["']?application/ld\+json""", re.IGNORECASE)
+_HEAD_CLOSE_BYTES = re.compile(rb"</head\s*>|<body\b", re.IGNORECASE)
+# Longest opening/closing tag we expect to straddle a chunk boundary
+_TAG_OVERLAP = 1024
+
+
+def type_names(node: Dict[str, Any]) -> List[str]:
+    """Normalized ``@type`` names of a node ("schema:Recipe" -> "Recipe")"""
+    types = node.get("@type")
+    if types is None:
+        return []
+    if not isinstance(types, list):
+        types = [types]
+    names = []
+    for value in types:
+        if isinstance(value, str):
+            names.append(value.rsplit("/", 1)[-1].rsplit(":", 1)[-1])
+    return names
+
+
+def is_recipe(node: Any) -> bool:
+    return isinstance(node, dict) and "Recipe" in type_names(node)
+
+
+def find_recipe(node: Any, depth: int = 0) -> Optional[Dict[str, Any]]:
+    """Depth-first search for the first Recipe node in decoded JSON-LD"""
+    if depth > _MAX_DEPTH:
+        return None
+    if isinstance(node, list):
+        for item in node:
+            recipe = find_recipe(item, depth + 1)
+            if recipe is not None:
+                return recipe
+        return None
+    if not isinstance(node, dict):
+        return None
+    if is_recipe(node):
+        return node
+    for key in _CONTAINER_KEYS:
+        child = node.get(key)
+        if isinstance(child, (dict, list)):
+            recipe = find_recipe(child, depth + 1)
+            if recipe is not None:
+                return recipe
+    return None
+
+
+def _decode_block(text: str) -> Any:
+    text = text.strip()
+    # Some CMSs wrap the JSON in HTML comments or CDATA markers
+    if text.startswith("<!--"):
+        text = text[4:]
+        if text.rstrip().endswith("-->"):
+            text = text.rstrip()[:-3]
+    if "CDATA[" in text[:20]:
+        text = text.split("CDATA[", 1)[1].rsplit("]]>", 1)[0]
+        text = text.rstrip().rstrip("/").rstrip()
+    # strict=False tolerates raw newlines and tabs inside strings
+    return json.loads(text, strict=False)
+
+
+def iter_json_ld_blocks(html: str):
+    """Yield the raw text of each ld+json script block, in document order"""
+    if "ld+json" not in html and "LD+JSON" not in html:
+        return
+    pos = 0
+    while True:
+        opening = _SCRIPT_OPEN.search(html, pos)
+        if opening is None:
+            return
+        closing = _SCRIPT_CLOSE.search(html, opening.end())
+        if closing is None:
+            return
+        if _LD_JSON_TYPE.search(opening.group(1)):
+            yield html[opening.end():closing.start()]
+        # Resume after this script so its body is never scanned for tags
+        pos = closing.end()
+
+
+def extract_recipe_json_ld(html: str) -> Optional[Dict[str, Any]]:
+    """Return the first schema.org Recipe embedded as JSON-LD, or None"""
+    for block in iter_json_ld_blocks(html):
+        try:
+            data = _decode_block(block)
+        except ValueError:
+            continue
+        recipe = find_recipe(data)
+        if recipe is not None:
+            return recipe
+    return None
+
+
+class RecipeSniffer:
+    """
+    Watch a page as it downloads and report when the rest can be skipped.
+
+    Called with the bytes received so far, it returns True once ``<head>`` has
+    been closed and the first ld+json block holding a Recipe is complete and
+    accepted by ``accept``. If that first Recipe is rejected (too incomplete
+    to use on its own) the whole page is needed and it never returns True.
+    Each call only scans bytes it has not seen, so total work stays linear.
+    """
+
+    def __init__(self, accept: Optional[Callable[[Dict[str, Any]], bool]] = None):
+        self.accept = accept
+        self.head_closed = False
+        self.recipe_found = False
+        self._given_up = False
+        self._head_pos = 0
+        self._script_pos = 0
+        self._open: Optional[Tuple[int, bool]] = None
+        self._close_pos = 0
+
+    def __call__(self, buffer: bytearray) -> bool:
+        if self._given_up:
+            return False
+        if not self.head_closed:
+            if _HEAD_CLOSE_BYTES.search(buffer, self._head_pos):
+                self.head_closed = True
+            else:
+                self._head_pos = max(0, len(buffer) - 16)
+        if not self.recipe_found:
+            self._scan_scripts(buffer)
+        return self.head_closed and self.recipe_found
+
+    def _scan_scripts(self, buffer: bytearray) -> None:
+        while not self.recipe_found and not self._given_up:
+            if self._open is None:
+                opening = _SCRIPT_OPEN_BYTES.search(buffer, self._script_pos)
+                if opening is None:
+                    self._script_pos = max(self._script_pos, len(buffer) - _TAG_OVERLAP)
+                    return
+                self._open = (opening.end(), bool(_LD_JSON_TYPE_BYTES.search(opening.group(1))))
+                self._close_pos = opening.end()
+            body_start, is_ld_json = self._open
+            closing = _SCRIPT_CLOSE_BYTES.search(buffer, self._close_pos)
+            if closing is None:
+                self._close_pos = max(body_start, len(buffer) - 16)
+                return
+            self._open = None
+            self._script_pos = closing.end()
+            if is_ld_json:
+                self._check_block(bytes(buffer[body_start:closing.start()]))
+
+    def _check_block(self, block: bytes) -> None:
+        try:
+            recipe = find_recipe(_decode_block(block.decode("utf-8", errors="replace")))
+        except ValueError:
+            return
+        if recipe is None:
+            return
+        # Only the first Recipe counts; the extractor will use the same one
+        if self.accept is None or self.accept(recipe):
+            self.recipe_found = True
+        else:
+            self._given_up = True
+
+
+def clean_text(value: Any) -> Optional[str]:
+    """Unescape entities, strip tags and collapse whitespace in a JSON-LD string"""
+    if value is None:
+        return None
+    text = str(value)
+    if "<" in text:
+        text = _TAG.sub(" ", text)
+    if "&" in text:
+        text = html.unescape(text)
+    text = _WHITESPACE.sub(" ", text).strip()
+    return text or None
+
+
+def first_text(value: Any) -> Optional[str]:
+    """Text of a value that may be a string, a list, or a node with a name/url"""
+    if isinstance(value, list):
+        for item in value:
+            text = first_text(item)
+            if text:
+                return text
+        return None
+    if isinstance(value, dict):
+        return clean_text(value.get("name") or value.get("url") or value.get("contentUrl"))
+    return clean_text(value)
+
+
+def as_text_list(value: Any) -> List[str]:
+    """Normalize a JSON-LD value that should be a list of strings"""
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        value = [value]
+    texts = []
+    for item in value:
+        if isinstance(item, (str, int, float)):
+            text = clean_text(item)
+            if text:
+                texts.append(text)
+    return texts
+
+
+def flatten_instructions(value: Any, depth: int = 0) -> List[str]:
+    """
+    Flatten ``recipeInstructions`` into step texts.
+
+    Handles plain strings, lists of strings, HowToStep / HowToDirection
+    nodes, and HowToSection / ItemList nodes nesting further steps.
+    """
+    if value is None or depth > _MAX_DEPTH:
+        return []
+    if isinstance(value, str):
+        text = clean_text(value)
+        return [text] if text else []
+    if isinstance(value, list):
+        steps: List[str] = []
+        for item in value:
+            steps.extend(flatten_instructions(item, depth + 1))
+        return steps
+    if isinstance(value, dict):
+        if "itemListElement" in value:
+            return flatten_instructions(value["itemListElement"], depth + 1)
+        text = clean_text(value.get("text") or value.get("name"))
+        if text:
+            return [text]
+    return []
@@ -1,40 +1,61 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, HttpUrl, Field
-from typing import Optional, List, Dict, Any
-from recipe_scrapers import scrape_me, scrape_html
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, HttpUrl, Field, TypeAdapter, ValidationError
+from typing import Optional, List, Dict, Any, Tuple
 from urllib.parse import urlparse
 import httpx
-import uuid
 import logging
 from datetime import datetime
 import os
 from dotenv import load_dotenv
-import re
-import json
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from functools import partial
+
+import config
+from fetcher import Page, conditional_headers, fetcher
+from extraction import is_complete_json_ld, parse_pool
+from cache import failure_cache, result_cache
+from breaker import CircuitOpenError
+from canonical import canonicalize_url
+from singleflight import parse_flight
+from storage import create_recipe_store
+from ids import recipe_id_for
+from jsonld import RecipeSniffer
+from snapshot import create_snapshot_store
+from jobs import Job, JobOutcome, JobRunner, create_job_queue
+from events import TERMINAL_STAGES, format_sse, job_events
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def parse_iso_duration(duration_str):
-    """Parse ISO 8601 duration format (e.g., PT5M) to human-readable format"""
-    if not duration_str:
-        return None
-    match = re.match(r'PT(?:(\d+)H)?(?:(\d+)M)?', duration_str)
-    if match:
-        hours = int(match.group(1) or 0)
-        minutes = int(match.group(2) or 0)
-        total_minutes = hours * 60 + minutes
-        if total_minutes > 0:
-            return f"{total_minutes} minutes"
-    return None
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared resources on startup and release them on shutdown"""
+    await fetcher.start()
+    await parse_pool.start()
+    await recipe_storage.start()
+    if snapshot_store is not None:
+        await snapshot_store.start()
+    await job_runner.start(run_parse_job)
+    try:
+        yield
+    finally:
+        for task in list(refresh_tasks.values()):
+            task.cancel()
+        await job_runner.close()
+        await recipe_storage.close()
+        await parse_pool.close()
+        await fetcher.close()
 
 app = FastAPI(
     title="Dishly.pro Recipe Parser API",
     description="Clean recipe scraping service for Dishly.pro",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS for frontend integration
@@ -79,11 +100,53 @@ class RecipeData(BaseModel):
     language: Optional[str] = None
     dietary_restrictions: Optional[List[str]] = None
 
+class ParseMetadata(BaseModel):
+    """How a recipe was extracted"""
+    strategy: str = Field(..., description="json-ld, scraper, json-ld-fallback or partial")
+    json_ld_fields: List[str] = Field(default_factory=list, description="Fields taken from JSON-LD")
+    parse_ms: Optional[float] = None
+    charset: Optional[str] = Field(None, description="Encoding the page was decoded with")
+    charset_source: Optional[str] = Field(None, description="header, bom, meta or default")
+    etag: Optional[str] = Field(None, description="ETag of the parsed page, used to revalidate it")
+    last_modified: Optional[str] = Field(None, description="Last-Modified of the parsed page")
+
 class RecipeParseResponse(BaseModel):
     """Response from recipe parsing"""
-    recipe_id: str = Field(..., description="Unique recipe ID")
+    recipe_id: str = Field(..., description="Recipe ID derived from the canonical URL")
     recipe: RecipeData
     message: Optional[str] = None
+    metadata: Optional[ParseMetadata] = None
+
+class RecipeBatchParseRequest(BaseModel):
+    # Validated per URL, so one malformed URL fails only its own item
+    urls: List[str] = Field(..., min_length=1, max_length=config.BATCH_MAX_URLS)
+
+class RecipeBatchItem(BaseModel):
+    """Outcome of parsing one URL in a batch"""
+    url: str
+    recipe_id: Optional[str] = None
+    recipe: Optional[RecipeData] = None
+    message: Optional[str] = None
+    error: Optional[str] = None
+    status_code: int = 200
+
+class RecipeBatchParseResponse(BaseModel):
+    """Response from batch recipe parsing, in request order"""
+    results: List[RecipeBatchItem]
+    succeeded: int
+    failed: int
+
+class JobStatusResponse(BaseModel):
+    """Status of an asynchronous parse job"""
+    job_id: str
+    status: str = Field(..., description="queued, running, done or failed")
+    url: str
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[RecipeParseResponse] = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None
 
 class ErrorResponse(BaseModel):
     error: str
@@ -103,346 +166,428 @@ async def health_check():
         "version": "1.0.0"
     }
 
-# In-memory storage for parsed recipes (for demo purposes)
+@app.get("/metrics")
+async def metrics():
+    """Runtime counters for caches and storage"""
+    return {
+        "fetch": fetcher.stats(),
+        "cache": result_cache.stats(),
+        "negative_cache": failure_cache.stats(),
+        "single_flight": parse_flight.stats(),
+        "storage": recipe_storage.stats(),
+        "snapshots": snapshot_store.stats() if snapshot_store is not None else None,
+        "jobs": job_runner.stats()
+    }
+
+# Storage for parsed recipes (bounded in-memory LRU or shared SQLite)
 recipes_db: Dict[str, Dict[str, Any]] = {}
-recipe_storage: Dict[str, RecipeData] = {}
+recipe_storage = create_recipe_store(RecipeData)
+
+# Optional on-disk snapshots of fetched pages (SNAPSHOT_DIR)
+snapshot_store = create_snapshot_store()
+
+# Background stale-while-revalidate refreshes, keyed by cache key
+refresh_tasks: Dict[str, asyncio.Task] = {}
+
+# Queue and workers for asynchronous parse jobs
+job_runner = JobRunner(create_job_queue())
 
 @app.post("/parse", response_model=RecipeParseResponse)
-async def parse_recipe(request: RecipeParseRequest):
+async def parse_recipe(
+    request: RecipeParseRequest,
+    async_mode: bool = Query(False, alias="async", description="Queue the parse and return a job id"),
+    priority: int = Query(0, description="Job priority for async mode; lower runs first")
+):
     """
     Parse a recipe from a given URL using recipe-scrapers
     """
-    url = str(request.url)
-    recipe_id = str(uuid.uuid4())
+    if async_mode:
+        job = await job_runner.queue.submit(str(request.url), priority)
+        job_events.emit(job.id, "queued", url=job.url, priority=priority)
+        logger.info(f"Queued parse job {job.id} for {job.url}")
+        return JSONResponse(
+            status_code=202,
+            content=job_status(job).model_dump()
+        )
     
-    logger.info(f"Parsing recipe from URL: {url}")
+    return await get_or_parse(str(request.url))
+
+@app.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str):
+    """
+    Report the status, and once finished the result, of a parse job
+    """
+    job = job_runner.queue.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Job not found"
+        )
     
-    try:
-        # First, fetch the page content
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1'
-        }
-        
-        response = httpx.get(url, headers=headers, timeout=30, follow_redirects=True)
-        response.raise_for_status()
-        html_content = response.text
-        
-        # Use recipe-scrapers with the HTML content
-        scraper = None
-        json_ld_data = None
-        
-        # First, try to extract JSON-LD data as fallback
-        json_ld_pattern = r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>'
-        json_ld_matches = re.findall(json_ld_pattern, html_content, re.DOTALL | re.IGNORECASE)
-        for match in json_ld_matches:
-            try:
-                data = json.loads(match)
-                # Handle both single objects and arrays
-                if isinstance(data, list):
-                    for item in data:
-                        if '@type' in item and ('Recipe' in item.get('@type', []) if isinstance(item.get('@type'), list) else item.get('@type') == 'Recipe'):
-                            json_ld_data = item
-                            break
-                elif '@type' in data and ('Recipe' in data.get('@type', []) if isinstance(data.get('@type'), list) else data.get('@type') == 'Recipe'):
-                    json_ld_data = data
-                if json_ld_data:
-                    logger.info("Found recipe data in JSON-LD")
-                    break
-            except json.JSONDecodeError:
+    return job_status(job)
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    Server-Sent Events stream of a parse job's stage transitions
+    """
+    if job_runner.queue.get(job_id) is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Job not found"
+        )
+    
+    async def event_stream():
+        async for event in job_events.subscribe(job_id):
+            if event is not None:
+                yield format_sse(event)
                 continue
-        
+            # No local events for a while: the job may be running in another
+            # worker process, so fall back to its persisted status
+            job = job_runner.queue.get(job_id)
+            if job is not None and job.status in TERMINAL_STAGES:
+                yield format_sse({
+                    "job_id": job.id,
+                    "stage": job.status,
+                    "timestamp": job.finished_at,
+                    "elapsed_ms": round((job.finished_at - job.created_at) * 1000, 1),
+                    "error": job.error,
+                })
+                return
+            yield ": keep-alive\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def job_status(job: Job) -> JobStatusResponse:
+    return JobStatusResponse(
+        job_id=job.id,
+        status=job.status,
+        url=job.url,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        result=job.result,
+        error=job.error,
+        status_code=job.status_code
+    )
+
+async def run_parse_job(job: Job) -> Dict[str, Any]:
+    """Job handler: parse through the normal cache / single-flight path"""
+    canonical_url = canonicalize_url(job.url)
+    job_events.watch_url(canonical_url, job.id)
+    try:
+        parse_response = await get_or_parse(job.url)
+    except HTTPException as e:
+        job_events.emit(job.id, "failed", error=e.detail, status_code=e.status_code)
+        raise JobOutcome(e.detail, e.status_code)
+    except Exception:
+        job_events.emit(job.id, "failed", error="An unexpected error occurred", status_code=500)
+        raise
+    finally:
+        job_events.unwatch_url(canonical_url, job.id)
+    job_events.emit(job.id, "done", recipe_id=parse_response.recipe_id, message=parse_response.message)
+    return parse_response.model_dump()
+
+async def get_or_parse(url: str) -> RecipeParseResponse:
+    """
+    Serve a recipe from the cache, or join / start a fetch and parse for it
+    """
+    cache_key = canonicalize_url(url)
+    
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        parse_response, is_stale = cached
+        logger.info(f"Cache {'stale hit' if is_stale else 'hit'} for {cache_key}")
+        if is_stale:
+            schedule_refresh(cache_key, url, parse_response)
+        # Keep the returned id resolvable even if storage evicted it
+        if parse_response.recipe_id not in recipe_storage:
+            recipe_storage.put(parse_response.recipe_id, parse_response.recipe, cache_key)
+        return parse_response
+    
+    # URLs that failed moments ago fail (or return their partial result) again
+    # without another fetch
+    failed = failure_cache.get(cache_key)
+    if failed is not None:
+        failure, _ = failed
+        logger.info(f"Negative cache hit for {cache_key}")
+        if isinstance(failure, tuple):
+            # A fresh exception per hit, so tracebacks don't pile up on a shared one
+            status_code, detail, headers = failure
+            raise HTTPException(status_code=status_code, detail=detail, headers=headers)
+        return failure
+    
+    try:
+        return await parse_flight.run(cache_key, lambda: fetch_and_parse(url))
+    except HTTPException as e:
+        # An open circuit already fails fast, and retrying a server error is fine
+        if e.status_code < 500:
+            failure_cache.set(cache_key, (e.status_code, e.detail, e.headers))
+        raise
+
+# Shared by all batches so concurrent imports can't overload a worker
+_batch_slots: Optional[asyncio.Semaphore] = None
+
+def batch_slots() -> asyncio.Semaphore:
+    """Global batch concurrency limit, created inside the running event loop"""
+    global _batch_slots
+    if _batch_slots is None:
+        _batch_slots = asyncio.Semaphore(config.BATCH_CONCURRENCY)
+    return _batch_slots
+
+@app.post("/parse/batch", response_model=RecipeBatchParseResponse)
+async def parse_recipe_batch(request: RecipeBatchParseRequest, stream: bool = False):
+    """
+    Parse many recipe URLs concurrently, reporting success or failure per URL.
+    
+    With ``?stream=true`` the response is NDJSON: one ``RecipeBatchItem`` per
+    line, written as soon as that URL finishes, in completion order.
+    """
+    urls = request.urls
+    domain_slots: Dict[str, asyncio.Semaphore] = {}
+    logger.info(f"Parsing batch of {len(urls)} URLs{' (streaming)' if stream else ''}")
+    
+    if stream:
+        return StreamingResponse(
+            stream_batch(urls, domain_slots),
+            media_type="application/x-ndjson"
+        )
+    
+    results = await asyncio.gather(*(parse_batch_item(url, domain_slots) for url in urls))
+    failed = sum(1 for item in results if item.error)
+    return RecipeBatchParseResponse(
+        results=results,
+        succeeded=len(results) - failed,
+        failed=failed
+    )
+
+_http_url = TypeAdapter(HttpUrl)
+
+async def parse_batch_item(url: str, domain_slots: Dict[str, asyncio.Semaphore]) -> RecipeBatchItem:
+    """Validate and parse one batch URL under the per-domain and global concurrency caps"""
+    try:
+        url = str(_http_url.validate_python(url))
+    except ValidationError as e:
+        return RecipeBatchItem(url=url, error=f"Invalid URL: {e.errors()[0]['msg']}", status_code=422)
+    domain = urlparse(url).netloc.lower()
+    if domain not in domain_slots:
+        domain_slots[domain] = asyncio.Semaphore(config.BATCH_PER_DOMAIN_CONCURRENCY)
+    async with domain_slots[domain], batch_slots():
         try:
-            # Try scraping with HTML content directly
-            scraper = scrape_html(html=html_content, org_url=url, wild_mode=False)
+            parse_response = await get_or_parse(url)
+        except HTTPException as e:
+            return RecipeBatchItem(url=url, error=e.detail, status_code=e.status_code)
         except Exception as e:
-            logger.warning(f"Standard HTML scraping failed, trying wild mode: {e}")
-            try:
-                scraper = scrape_html(html=html_content, org_url=url, wild_mode=True)
-            except Exception as e2:
-                logger.warning(f"Wild mode HTML scraping failed, trying URL scraping: {e2}")
-                try:
-                    scraper = scrape_me(url, wild_mode=True)
-                except Exception as e3:
-                    logger.error(f"All scraping methods failed: {e3}")
-                    scraper = None
-        
-        # Extract basic recipe information
-        title = None
-        if scraper:
-            try:
-                title = scraper.title()
-            except Exception as e:
-                logger.warning(f"Could not extract title: {e}")
-        
-        if not title:
-            # Try to extract from URL as fallback
-            url_parts = url.split('/')[-1].replace('-', ' ').replace('_', ' ')
-            title = re.sub(r'\d+', '', url_parts).replace('recipe', '').strip().title()
-            if not title:
-                title = "Recipe from " + urlparse(url).netloc.replace('www.', '')
-        
-        # Extract all available recipe data using recipe-scrapers methods
-        # Get ingredients - try multiple methods
-        ingredients = []
-        if scraper:
-            try:
-                ingredients = scraper.ingredients()
-                if not ingredients:
-                    logger.warning(f"No ingredients found for {url}")
-            except Exception as e:
-                logger.warning(f"Error getting ingredients: {e}")
-        
-        # Fallback to JSON-LD data if available
-        if not ingredients and json_ld_data and 'recipeIngredient' in json_ld_data:
-            ingredients = json_ld_data['recipeIngredient']
-            logger.info(f"Using ingredients from JSON-LD: {len(ingredients)} items")
-        
-        # Get instructions - try multiple methods
-        instructions = []
-        if scraper:
-            try:
-                # First try to get as list
-                instructions = scraper.instructions_list()
-            except:
-                try:
-                    # Fall back to string instructions
-                    instructions_str = scraper.instructions()
-                    if instructions_str:
-                        # Split by common patterns
-                        # Split by numbered steps, double newlines, or periods followed by capital letters
-                        instructions = re.split(r'(?:\d+[.)\s]+|\n\n+|(?<=\.)\s+(?=[A-Z]))', instructions_str)
-                        instructions = [inst.strip() for inst in instructions if inst.strip() and len(inst.strip()) > 10]
-                except Exception as e:
-                    logger.warning(f"Error getting instructions: {e}")
-        
-        # Fallback to JSON-LD data if available
-        if not instructions and json_ld_data and 'recipeInstructions' in json_ld_data:
-            json_instructions = json_ld_data['recipeInstructions']
-            instructions = []
-            for inst in json_instructions:
-                if isinstance(inst, dict) and 'text' in inst:
-                    instructions.append(inst['text'])
-                elif isinstance(inst, str):
-                    instructions.append(inst)
-            logger.info(f"Using instructions from JSON-LD: {len(instructions)} steps")
-        
-        # Don't fail if we can't get all data - just warn
-        if not ingredients:
-            logger.warning(f"No ingredients found for {url}")
-            ingredients = ["Please check the original recipe for ingredients"]
-        if not instructions:
-            logger.warning(f"No instructions found for {url}")
-            instructions = ["Please check the original recipe for instructions"]
-        
-        # Extract ALL available fields from recipe-scrapers
-        # Description
-        description = None
-        if scraper:
-            try:
-                description = scraper.description()
-            except:
-                pass
-        
-        # Yields/Servings
-        servings = None
-        yields = None
-        if scraper:
-            try:
-                yields = scraper.yields()
-                if yields:
-                    # Extract number from yields string
-                    match = re.search(r'\d+', str(yields))
-                    if match:
-                        servings = int(match.group())
-            except:
-                pass
-        
-        # Fallback to JSON-LD data
-        if not yields and json_ld_data:
-            if 'recipeYield' in json_ld_data:
-                yields = str(json_ld_data['recipeYield'])
-                match = re.search(r'\d+', yields)
-                if match:
-                    servings = int(match.group())
-        
-        # Timing information
-        cook_time = None
-        prep_time = None
-        total_time = None
-        if scraper:
-            try:
-                time_val = scraper.cook_time()
-                if time_val:
-                    cook_time = f"{time_val} minutes" if isinstance(time_val, (int, float)) else str(time_val)
-            except:
-                pass
-            
-            try:
-                time_val = scraper.prep_time()
-                if time_val:
-                    prep_time = f"{time_val} minutes" if isinstance(time_val, (int, float)) else str(time_val)
-            except:
-                pass
-            
-            try:
-                time_val = scraper.total_time()
-                if time_val:
-                    total_time = f"{time_val} minutes" if isinstance(time_val, (int, float)) else str(time_val)
-            except:
-                pass
-        
-        # Fallback to JSON-LD data
-        if json_ld_data:
-            if not prep_time and 'prepTime' in json_ld_data:
-                prep_time = parse_iso_duration(json_ld_data['prepTime'])
-            if not cook_time and 'cookTime' in json_ld_data:
-                cook_time = parse_iso_duration(json_ld_data['cookTime'])
-            if not total_time and 'totalTime' in json_ld_data:
-                total_time = parse_iso_duration(json_ld_data['totalTime'])
-        
-        # Nutrition information
-        nutrition = {}
-        if scraper:
-            try:
-                nutrients = scraper.nutrients()
-                if nutrients:
-                    nutrition = {
-                        "calories": nutrients.get("calories"),
-                        "protein": nutrients.get("proteinContent"),
-                        "carbs": nutrients.get("carbohydrateContent"),
-                        "fat": nutrients.get("fatContent"),
-                        "sugar": nutrients.get("sugarContent"),
-                        "sodium": nutrients.get("sodiumContent"),
-                        "fiber": nutrients.get("fiberContent"),
-                        "cholesterol": nutrients.get("cholesterolContent"),
-                        "saturatedFat": nutrients.get("saturatedFatContent")
-                    }
-                    # Remove None values
-                    nutrition = {k: v for k, v in nutrition.items() if v is not None}
-            except:
-                pass
-        
-        # Media
-        image_url = None
-        video_url = None
-        notes = None
-        author = None
-        ratings = None
-        ratings_count = None
-        cuisine = None
-        category = None
-        keywords = None
-        language = None
-        dietary_restrictions = None
-        
-        if scraper:
-            try:
-                image_url = scraper.image()
-            except:
-                pass
-            
-            try:
-                video_url = scraper.video()
-            except:
-                pass
-            
-            try:
-                notes = scraper.notes()
-            except:
-                pass
-            
-            try:
-                author = scraper.author()
-            except:
-                pass
-            
-            try:
-                ratings = scraper.ratings()
-            except:
-                pass
-            try:
-                ratings_count = scraper.ratings_count()
-            except:
-                pass
-            
-            try:
-                cuisine = scraper.cuisine()
-            except:
-                pass
-            
-            try:
-                category = scraper.category()
-            except:
-                pass
-            
-            try:
-                keywords = scraper.keywords()
-            except:
-                pass
-            
-            try:
-                language = scraper.language()
-            except:
-                pass
-            
-            try:
-                dietary_restrictions = scraper.dietary_restrictions()
-            except:
-                pass
+            logger.error(f"Batch parse of {url} failed: {e}")
+            return RecipeBatchItem(url=url, error="An unexpected error occurred", status_code=500)
+    return RecipeBatchItem(
+        url=url,
+        recipe_id=parse_response.recipe_id,
+        recipe=parse_response.recipe,
+        message=parse_response.message
+    )
+
+async def stream_batch(urls: List[str], domain_slots: Dict[str, asyncio.Semaphore]):
+    """
+    Yield NDJSON lines as batch URLs complete.
+    
+    A fixed number of workers pull URLs from a shared iterator and hand
+    finished items over a bounded queue, so memory use depends on the
+    concurrency cap rather than the batch size, and a slow reader applies
+    backpressure to the workers.
+    """
+    pending = iter(urls)
+    finished: asyncio.Queue = asyncio.Queue(maxsize=config.BATCH_CONCURRENCY)
+    
+    async def worker():
+        for url in pending:
+            await finished.put(await parse_batch_item(url, domain_slots))
+    
+    workers = [
+        asyncio.create_task(worker())
+        for _ in range(min(config.BATCH_CONCURRENCY, len(urls)))
+    ]
+    try:
+        for _ in range(len(urls)):
+            item = await finished.get()
+            yield item.model_dump_json() + "\n"
+    finally:
+        # The client may disconnect mid-stream; stop the remaining work
+        for task in workers:
+            task.cancel()
+
+def schedule_refresh(cache_key: str, url: str, previous: RecipeParseResponse) -> None:
+    """
+    Refresh a stale cache entry in the background, at most once at a time.
+    
+    The refresh revalidates with the validators saved in ``previous``, so an
+    unchanged page costs a 304 and no re-parse.
+    """
+    if cache_key in refresh_tasks or parse_flight.is_running(cache_key):
+        return
+    
+    async def refresh():
+        try:
+            # A refresh must see the live page, not the snapshot behind the stale entry
+            await parse_flight.run(
+                cache_key,
+                lambda: fetch_and_parse(url, use_snapshot=False, previous=previous)
+            )
+        except HTTPException as e:
+            logger.warning(f"Background refresh of {url} failed: {e.detail}")
+        finally:
+            refresh_tasks.pop(cache_key, None)
+    
+    refresh_tasks[cache_key] = asyncio.create_task(refresh())
+
+async def load_page(
+    url: str,
+    canonical_url: str,
+    use_snapshot: bool = True,
+    previous: Optional[RecipeParseResponse] = None
+) -> Tuple[Optional[Page], str]:
+    """
+    Get a page to parse, from a snapshot or the network.
+    
+    Returns ``(page, source)`` with source ``snapshot``, ``network`` or
+    ``revalidated`` (a 304 confirmed the stored snapshot). The page is None
+    when a 304 confirmed that ``previous`` is still current.
+    """
+    if use_snapshot and snapshot_store is not None and config.SNAPSHOT_MAX_AGE > 0:
+        snapshot = await snapshot_store.get(canonical_url, max_age=config.SNAPSHOT_MAX_AGE)
+        if snapshot is not None:
+            return snapshot[0], "snapshot"
+    
+    # Revalidate with the validators of the previous parse, else the snapshot's;
+    # a 304 only confirms whichever of the two they came from
+    etag = last_modified = None
+    ref = None
+    if previous is not None and previous.metadata is not None:
+        etag, last_modified = previous.metadata.etag, previous.metadata.last_modified
+    validated_previous = bool(etag or last_modified)
+    if not validated_previous and snapshot_store is not None:
+        ref = await snapshot_store.get_ref(canonical_url)
+        if ref is not None:
+            etag = ref["headers"].get("etag")
+            last_modified = ref["headers"].get("last-modified")
+    
+    # Stop reading once the page's JSON-LD alone is enough to build the recipe,
+    # unless the page is being snapshotted: snapshots must be whole pages
+    make_stop = None
+    if config.HTTP_EARLY_STOP and config.JSONLD_FAST_PATH and snapshot_store is None:
+        make_stop = partial(RecipeSniffer, accept=is_complete_json_ld)
+    page = await fetcher.get(url, make_stop=make_stop, headers=conditional_headers(etag, last_modified))
+    
+    if page.status_code == 304:
+        if validated_previous:
+            return None, "revalidated"
+        if ref is not None:
+            snapshot_page = await snapshot_store.revalidate(ref, page.headers)
+            if snapshot_page is not None:
+                return snapshot_page, "revalidated"
+        # Nothing left to reuse, so download the page unconditionally
+        page = await fetcher.get(url, make_stop=make_stop)
+    
+    if snapshot_store is not None:
+        try:
+            await snapshot_store.put(canonical_url, page)
+        except OSError as e:
+            logger.warning(f"Could not save snapshot of {url}: {e}")
+    return page, "network"
+
+async def fetch_and_parse(
+    url: str,
+    use_snapshot: bool = True,
+    previous: Optional[RecipeParseResponse] = None
+) -> RecipeParseResponse:
+    """
+    Fetch and parse a recipe, caching successful results
+
+    With a snapshot store configured, a snapshot younger than
+    ``SNAPSHOT_MAX_AGE`` is parsed instead of downloading the page again,
+    and every download is saved as the URL's latest snapshot. ``previous``
+    is the cached result being refreshed; if the site answers 304 Not
+    Modified it is kept as is.
+    """
+    canonical_url = canonicalize_url(url)
+    recipe_id = recipe_id_for(canonical_url)
+    
+    logger.info(f"Parsing recipe from URL: {url}")
+    
+    try:
+        # First, fetch the page content over the shared async client
+        job_events.emit_for_url(canonical_url, "fetching", url=url)
+        fetch_started = time.perf_counter()
+        page, source = await load_page(url, canonical_url, use_snapshot, previous)
+        if page is None:
+            # Unchanged since the previous parse: keep it and restart its TTL
+            logger.info(f"Not modified: {url}")
+            job_events.emit_for_url(canonical_url, "not-modified")
+            result_cache.set(canonical_url, previous)
+            if previous.recipe_id not in recipe_storage:
+                recipe_storage.put(previous.recipe_id, previous.recipe, canonical_url)
+            return previous
+        job_events.emit_for_url(
+            canonical_url,
+            "fetched",
+            bytes=len(page.content),
+            source=source,
+            stopped_early=page.stopped_early,
+            truncated=page.truncated,
+            ms=round((time.perf_counter() - fetch_started) * 1000, 1)
+        )
         
-        # Get source information
-        source_name = urlparse(url).netloc.replace('www.', '')
+        # Parse the page in the worker pool so the event loop stays free
+        job_events.emit_for_url(canonical_url, "parsing")
+        parse_started = time.perf_counter()
+        extraction = await parse_pool.extract(page.content, url, page.encoding)
+        parse_ms = round((time.perf_counter() - parse_started) * 1000, 1)
+        fields = extraction["fields"]
+        if extraction["strategy"] == "json-ld-fallback":
+            job_events.emit_for_url(canonical_url, "json-ld-fallback", fields=extraction["json_ld_fields"])
+        title = fields["title"]
+        recipe_id = recipe_id_for(canonical_url, fields)
         
         # Create comprehensive recipe object with all extracted data
-        recipe = RecipeData(
-            id=recipe_id,
-            title=title,
-            description=description,
-            servings=servings,
-            yields=yields,
-            cook_time=cook_time,
-            prep_time=prep_time,
-            total_time=total_time,
-            ingredients=ingredients,
-            instructions=instructions,
-            notes=notes,
-            nutrition=nutrition if nutrition else None,
-            source_url=url,
-            source_name=source_name,
-            video_url=video_url,
-            has_video=bool(video_url),
-            image_url=image_url,
-            author=author,
-            ratings=ratings,
-            ratings_count=ratings_count,
-            cuisine=cuisine,
-            category=category,
-            keywords=keywords,
-            language=language,
-            dietary_restrictions=dietary_restrictions
-        )
+        recipe = RecipeData(id=recipe_id, **fields)
         
         logger.info(f"Successfully parsed recipe: {title}")
         
         # Store the recipe for later retrieval
-        recipe_storage[recipe_id] = recipe
+        recipe_storage.put(recipe_id, recipe, canonical_url)
         
         # Return the parsed recipe
-        return RecipeParseResponse(
+        parse_response = RecipeParseResponse(
             recipe_id=recipe_id,
             recipe=recipe,
-            message="Recipe parsed successfully"
+            message="Recipe parsed successfully",
+            metadata=ParseMetadata(
+                strategy=extraction["strategy"],
+                json_ld_fields=extraction["json_ld_fields"],
+                parse_ms=parse_ms,
+                charset=extraction["charset"],
+                charset_source=extraction["charset_source"],
+                etag=page.headers.get("etag"),
+                last_modified=page.headers.get("last-modified")
+            )
         )
+        result_cache.set(canonical_url, parse_response)
+        return parse_response
         
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
+    except CircuitOpenError as e:
+        logger.warning(f"Not fetching {url}: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail=f"This recipe website is not responding right now. Please try again in {max(1, round(e.retry_after))} seconds.",
+            headers={"Retry-After": str(max(1, round(e.retry_after)))}
+        )
     except httpx.HTTPStatusError as e:
         logger.error(f"HTTP error accessing {url}: {e}")
         if e.response.status_code == 404:
@@ -491,14 +636,19 @@ async def parse_recipe(request: RecipeParseRequest):
                 instructions=["Unable to extract instructions - please check the original recipe"]
             )
             
-            # Store the recipe
-            recipe_storage[recipe_id] = recipe
+            # Store the recipe, without overwriting a complete one parsed earlier
+            if recipe_id not in recipe_storage:
+                recipe_storage.put(recipe_id, recipe, canonical_url)
             
-            return RecipeParseResponse(
+            partial_response = RecipeParseResponse(
                 recipe_id=recipe_id,
                 recipe=recipe,
-                message="Partial recipe data extracted. Some information may be missing."
+                message="Partial recipe data extracted. Some information may be missing.",
+                metadata=ParseMetadata(strategy="partial")
             )
+            # Don't fetch and fail to parse the same page again straight away
+            failure_cache.set(canonical_url, partial_response)
+            return partial_response
         except:
             # If even that fails, return a proper error
             raise HTTPException(
@@ -511,13 +661,14 @@ async def get_recipe(recipe_id: str):
     """
     Retrieve a previously parsed recipe by ID
     """
-    if recipe_id not in recipe_storage:
+    recipe = recipe_storage.get(recipe_id)
+    if recipe is None:
         raise HTTPException(
             status_code=404,
             detail="Recipe not found"
         )
     
-    return recipe_storage[recipe_id]
+    return recipe
 
 # Error handlers
 @app.exception_handler(HTTPException)
@@ -527,7 +678,8 @@ async def http_exception_handler(request, exc):
         content={
             "error": exc.detail,
             "status_code": exc.status_code
-        }
+        },
+        headers=exc.headers
     )
 
 @app.exception_handler(Exception)
@@ -0,0 +1,124 @@
+"""
+Per-host request rate limiting for outbound fetches.
+
+Each host gets a token bucket refilled at ``HTTP_HOST_RATE`` requests per
+second, holding up to ``HTTP_HOST_BURST`` tokens. A request takes a token,
+or reserves the next one and sleeps until it is due, so waiters on a busy
+host queue up in order without holding anything that requests to other
+hosts need.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+import config
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations instead of blocking"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Take a token and return how many seconds to wait before using it"""
+        self._refill()
+        self.tokens -= 1
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def try_take(self) -> bool:
+        """Take a token only if one is available right now"""
+        self._refill()
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+def parse_rate_overrides(items) -> Dict[str, float]:
+    """``["allrecipes.com=2", ...]`` -> ``{"allrecipes.com": 2.0}``"""
+    overrides = {}
+    for item in items:
+        host, _, rate = item.partition("=")
+        if host and rate:
+            overrides[host.strip().lower()] = float(rate)
+    return overrides
+
+
+class HostRateLimiter:
+    """Token buckets keyed by host, created on first use"""
+
+    def __init__(
+        self,
+        rate: float = config.HTTP_HOST_RATE,
+        burst: int = config.HTTP_HOST_BURST,
+        overrides: Optional[Dict[str, float]] = None,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.overrides = overrides if overrides is not None else parse_rate_overrides(config.HTTP_HOST_RATE_OVERRIDES)
+        self._buckets: Dict[str, Optional[TokenBucket]] = {}
+        self.throttled = 0
+        self.wait_seconds = 0.0
+
+    def _rate_for(self, host: str) -> float:
+        # "www.allrecipes.com" falls back to the override for "allrecipes.com"
+        if host in self.overrides:
+            return self.overrides[host]
+        if host.startswith("www.") and host[4:] in self.overrides:
+            return self.overrides[host[4:]]
+        return self.rate
+
+    def _bucket_for(self, host: str) -> Optional[TokenBucket]:
+        if host not in self._buckets:
+            rate = self._rate_for(host)
+            self._buckets[host] = TokenBucket(rate, self.burst) if rate > 0 else None
+        return self._buckets[host]
+
+    def try_acquire(self, host: str) -> bool:
+        """Take a token for ``host`` without waiting; False if none is free now"""
+        bucket = self._bucket_for(host)
+        return bucket is None or bucket.try_take()
+
+    def refund(self, host: str) -> None:
+        """Give back a token that was taken but not used"""
+        bucket = self._buckets.get(host)
+        if bucket is not None:
+            bucket.tokens = min(bucket.burst, bucket.tokens + 1)
+
+    async def wait(self, host: str) -> float:
+        """Wait for the host's next request slot; returns the seconds waited"""
+        bucket = self._bucket_for(host)
+        if bucket is None:
+            return 0.0
+        delay = bucket.reserve()
+        if delay > 0:
+            self.throttled += 1
+            self.wait_seconds += delay
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                # Hand the unused reservation back
+                self.refund(host)
+                raise
+        return delay
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "hosts": len(self._buckets),
+            "throttled": self.throttled,
+            "wait_seconds": round(self.wait_seconds, 3),
+        }
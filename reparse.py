@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Re-run recipe extraction over the on-disk page snapshots, offline.
+
+Reads every snapshot under ``SNAPSHOT_DIR`` (or ``--dir``), parses it in a
+pool of worker processes and reports how each page was extracted. Nothing
+is downloaded. Snapshots of incomplete pages (cut off by an early stop or the
+size cap, saved by older versions) are still parsed but counted separately.
+``--store`` writes the new results to the configured recipe
+store (``RECIPE_STORE_BACKEND``) and ``--out`` writes one JSON line per page.
+
+Usage:
+    python reparse.py [--dir snapshots/] [--workers 8] [--url URL ...] [--out results.ndjson] [--store]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import config
+from canonical import canonicalize_url
+from extraction import _warm_worker, extract_page
+from ids import recipe_id_for
+from snapshot import SnapshotStore
+
+
+async def reparse(args) -> int:
+    # Imported here so --help works without loading the app
+    from main import RecipeData, recipe_storage
+
+    snapshots = SnapshotStore(args.dir, max_bytes=0)
+    wanted = {canonicalize_url(url) for url in args.url} if args.url else None
+    refs = [ref for ref in snapshots.iter_refs() if wanted is None or ref["canonical_url"] in wanted]
+    if not refs:
+        print(f"No snapshots found in {args.dir}")
+        return 1
+    print(f"Re-parsing {len(refs)} snapshots from {args.dir} with {args.workers} workers")
+
+    if args.store:
+        await recipe_storage.start()
+    executor = ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_warm_worker,
+    )
+    loop = asyncio.get_running_loop()
+    # Bound pages held in memory at once
+    slots = asyncio.Semaphore(args.workers * 4)
+    strategies: Counter = Counter()
+    out = open(args.out, "w", encoding="utf-8") if args.out else None
+    total_bytes = 0
+    incomplete = 0
+    started = time.perf_counter()
+
+    async def reparse_one(ref):
+        nonlocal total_bytes, incomplete
+        async with slots:
+            page = await asyncio.to_thread(snapshots.load, ref)
+            if page is None:
+                strategies["missing"] += 1
+                return
+            total_bytes += len(page.content)
+            if page.truncated or page.stopped_early:
+                incomplete += 1
+            try:
+                extraction = await loop.run_in_executor(
+                    executor, extract_page, page.content, page.url, page.encoding
+                )
+            except Exception as e:
+                strategies["failed"] += 1
+                print(f"FAILED {ref['url']}: {e}", file=sys.stderr)
+                return
+        strategies[extraction["strategy"]] += 1
+        fields = extraction["fields"]
+        recipe_id = recipe_id_for(ref["canonical_url"], fields)
+        if args.store:
+            recipe_storage.put(recipe_id, RecipeData(id=recipe_id, **fields), ref["canonical_url"])
+        if out is not None:
+            out.write(json.dumps({
+                "url": ref["url"],
+                "recipe_id": recipe_id,
+                "strategy": extraction["strategy"],
+                "json_ld_fields": extraction["json_ld_fields"],
+                "incomplete": page.truncated or page.stopped_early,
+                "fields": fields,
+            }) + "\n")
+
+    try:
+        await asyncio.gather(*(reparse_one(ref) for ref in refs))
+    finally:
+        executor.shutdown()
+        if out is not None:
+            out.close()
+        if args.store:
+            await recipe_storage.close()
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"Parsed {len(refs)} pages in {elapsed:.1f}s "
+        f"({len(refs) / elapsed:.1f} pages/s, {total_bytes / elapsed / 1e6:.1f} MB/s)"
+    )
+    for strategy, count in strategies.most_common():
+        print(f"  {strategy:<18} {count}")
+    if incomplete:
+        print(f"{incomplete} snapshots hold incomplete pages; their results may not reflect the parser")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=config.SNAPSHOT_DIR, help="snapshot directory (default: SNAPSHOT_DIR)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="parser processes")
+    parser.add_argument("--url", action="append", default=[], help="only re-parse this URL (repeatable)")
+    parser.add_argument("--out", help="write one JSON result per page to this file")
+    parser.add_argument("--store", action="store_true", help="save results to the configured recipe store")
+    args = parser.parse_args()
+    if not args.dir:
+        sys.exit("Set SNAPSHOT_DIR or pass --dir")
+    sys.exit(asyncio.run(reparse(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+In-process DNS cache for the shared fetch client.
+
+httpx resolves the host again for every new connection. ``DNSCache`` keeps
+answers in memory for their DNS TTL (clamped to ``DNS_CACHE_MIN_TTL`` ..
+``DNS_CACHE_MAX_TTL``), remembers failed lookups for ``DNS_NEGATIVE_TTL``,
+holds at most ``DNS_CACHE_MAX_ENTRIES`` hosts and coalesces concurrent
+lookups of the same host.
+
+Record TTLs come from aiodns when it is installed; otherwise the system
+resolver is used and answers are kept for ``DNS_CACHE_TTL``. Names aiodns
+cannot find (e.g. ones only in ``/etc/hosts``) also go to the system resolver.
+
+``CachingNetworkBackend`` plugs the cache into httpcore, so connections are
+opened to cached addresses while TLS still verifies the original hostname.
+"""
+
+import asyncio
+import ipaddress
+import logging
+import socket
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import httpcore
+
+import config
+
+try:
+    import aiodns
+except ImportError:  # pragma: no cover - optional dependency
+    aiodns = None
+
+logger = logging.getLogger(__name__)
+
+
+class DNSCache:
+    """TTL-respecting, size-bounded async DNS cache with negative caching"""
+
+    def __init__(
+        self,
+        max_entries: int = config.DNS_CACHE_MAX_ENTRIES,
+        default_ttl: float = config.DNS_CACHE_TTL,
+        min_ttl: float = config.DNS_CACHE_MIN_TTL,
+        max_ttl: float = config.DNS_CACHE_MAX_TTL,
+        negative_ttl: float = config.DNS_NEGATIVE_TTL,
+    ):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        # host -> (addresses, or None for a failed lookup, expires_at)
+        self._entries: "OrderedDict[str, Tuple[Optional[List[str]], float]]" = OrderedDict()
+        self._lookups: Dict[str, asyncio.Future] = {}
+        self._resolver = None
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.failures = 0
+
+    def _get(self, host: str) -> Optional[Tuple[Optional[List[str]], float]]:
+        entry = self._entries.get(host)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._entries[host]
+            return None
+        self._entries.move_to_end(host)
+        return entry
+
+    def _set(self, host: str, addresses: Optional[List[str]], ttl: float) -> None:
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        self._entries[host] = (addresses, time.monotonic() + ttl)
+        self._entries.move_to_end(host)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def resolve(self, host: str) -> List[str]:
+        """Addresses for ``host``; raises ``socket.gaierror`` if it does not resolve"""
+        if _is_ip(host):
+            return [host]
+        entry = self._get(host)
+        if entry is not None:
+            addresses, _ = entry
+            if addresses is None:
+                self.negative_hits += 1
+                raise socket.gaierror(socket.EAI_NONAME, f"Cached lookup failure for {host}")
+            self.hits += 1
+            return addresses
+
+        self.misses += 1
+        lookup = self._lookups.get(host)
+        if lookup is None:
+            lookup = asyncio.ensure_future(self._lookup(host))
+            self._lookups[host] = lookup
+            lookup.add_done_callback(lambda _: self._lookups.pop(host, None))
+        return await asyncio.shield(lookup)
+
+    async def _lookup(self, host: str) -> List[str]:
+        try:
+            addresses, ttl = await self._query(host)
+        except OSError as e:
+            self.failures += 1
+            self._set(host, None, self.negative_ttl)
+            raise socket.gaierror(socket.EAI_NONAME, f"Could not resolve {host}: {e}")
+        self._set(host, addresses, min(self.max_ttl, max(self.min_ttl, ttl)))
+        return addresses
+
+    async def _query(self, host: str) -> Tuple[List[str], float]:
+        if aiodns is not None:
+            if self._resolver is None:
+                self._resolver = aiodns.DNSResolver()
+            for qtype in ("A", "AAAA"):
+                try:
+                    records = await self._resolver.query(host, qtype)
+                except aiodns.error.DNSError:
+                    continue
+                if records:
+                    return [record.host for record in records], min(record.ttl for record in records)
+        infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        if not addresses:
+            raise socket.gaierror(socket.EAI_NONAME, host)
+        return addresses, self.default_ttl
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "resolver": "aiodns" if aiodns is not None else "system",
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "failures": self.failures,
+            "hit_rate": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+    except ValueError:
+        return False
+    return True
+
+
+class CachingNetworkBackend(httpcore.AsyncNetworkBackend):
+    """httpcore network backend that resolves hosts through a ``DNSCache``"""
+
+    def __init__(self, cache: DNSCache, backend: Optional[httpcore.AsyncNetworkBackend] = None):
+        self.cache = cache
+        self._backend = backend or httpcore.AnyIOBackend()
+
+    async def connect_tcp(
+        self,
+        host: str,
+        port: int,
+        timeout: Optional[float] = None,
+        local_address: Optional[str] = None,
+        socket_options: Optional[Iterable[Any]] = None,
+    ) -> httpcore.AsyncNetworkStream:
+        try:
+            addresses = await asyncio.wait_for(self.cache.resolve(host), timeout=timeout)
+        except socket.gaierror as e:
+            raise httpcore.ConnectError(str(e))
+        except asyncio.TimeoutError:
+            raise httpcore.ConnectTimeout(f"Timed out resolving {host}")
+        # Try each address in turn, as getaddrinfo-based connects do
+        error: Optional[Exception] = None
+        for address in addresses:
+            try:
+                return await self._backend.connect_tcp(
+                    address, port, timeout=timeout, local_address=local_address, socket_options=socket_options
+                )
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+        raise error
+
+    async def connect_unix_socket(self, path: str, timeout: Optional[float] = None, socket_options=None):
+        return await self._backend.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
@@ -0,0 +1,343 @@
+"""
+On-disk snapshots of fetched recipe pages.
+
+Raw page bytes are stored content-addressed (by SHA-256) and compressed
+under ``SNAPSHOT_DIR``, with a small JSON ref per canonical URL pointing at
+the latest snapshot. Identical pages reached through different URLs are
+stored once. Only complete pages are stored: early stop is off while
+snapshots are enabled, and pages cut off by the size cap are skipped. When
+the objects outgrow ``SNAPSHOT_MAX_BYTES`` the least
+recently used ones are deleted.
+
+Several processes may share ``SNAPSHOT_DIR``. Each one rescans the objects
+on disk at least every ``_RESCAN_INTERVAL`` seconds, and object mtimes record
+last access, so eviction follows what is actually stored by every process
+rather than this process's own writes.
+
+``fetch_and_parse`` reads a snapshot younger than ``SNAPSHOT_MAX_AGE``
+instead of downloading the page again, and ``reparse.py`` re-runs
+extraction over every stored snapshot without touching the network.
+
+Objects are compressed with zstandard when it is installed, otherwise with
+zlib; both formats are read back regardless of which one wrote them.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import httpx
+
+import config
+from fetcher import Page
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Response headers kept with a snapshot, for later decoding and revalidation
+SNAPSHOT_HEADERS = ("content-type", "etag", "last-modified")
+
+# Seconds between rescans of the objects on disk, to see other processes' writes
+_RESCAN_INTERVAL = 60.0
+
+_ZSTD_SUFFIX = ".zst"
+_ZLIB_SUFFIX = ".zz"
+
+
+def _compress(data: bytes) -> Tuple[bytes, str]:
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=config.SNAPSHOT_ZSTD_LEVEL).compress(data), _ZSTD_SUFFIX
+    return zlib.compress(data, 6), _ZLIB_SUFFIX
+
+
+def _decompress(data: bytes, suffix: str) -> bytes:
+    if suffix == _ZSTD_SUFFIX:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read .zst snapshots")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    """Write via a temp file and rename, so readers never see partial files"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class SnapshotStore:
+    """Content-addressed, compressed, size-bounded store of raw page bytes"""
+
+    def __init__(self, directory: str = config.SNAPSHOT_DIR, max_bytes: int = config.SNAPSHOT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._objects_dir = os.path.join(directory, "objects")
+        self._refs_dir = os.path.join(directory, "refs")
+        # Object path -> compressed size, least recently used first
+        self._objects: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._indexed_at = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.skipped = 0
+        self.evictions = 0
+        self.refs_dropped = 0
+
+    async def start(self) -> None:
+        await asyncio.to_thread(self.load_index)
+        logger.info(
+            f"Snapshot store opened at {self.directory} "
+            f"({len(self._objects)} objects, {self._total_bytes} bytes)"
+        )
+
+    def load_index(self) -> None:
+        """Scan the objects on disk, oldest access first, to seed LRU eviction"""
+        self._indexed_at = time.monotonic()
+        entries = []
+        for root, _, files in os.walk(self._objects_dir):
+            for name in files:
+                if name.startswith(".tmp-"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+        entries.sort()
+        with self._lock:
+            self._objects = OrderedDict((path, size) for _, path, size in entries)
+            self._total_bytes = sum(size for _, _, size in entries)
+
+    def _ref_path(self, canonical_url: str) -> str:
+        key = hashlib.blake2b(canonical_url.encode("utf-8"), digest_size=16).hexdigest()
+        return os.path.join(self._refs_dir, key[:2], f"{key}.json")
+
+    def _object_path(self, digest: str, suffix: str) -> str:
+        return os.path.join(self._objects_dir, digest[:2], f"{digest}{suffix}")
+
+    def _find_object(self, digest: str) -> Optional[str]:
+        for suffix in (_ZSTD_SUFFIX, _ZLIB_SUFFIX):
+            path = self._object_path(digest, suffix)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _touch(self, path: str) -> None:
+        with self._lock:
+            if path in self._objects:
+                self._objects.move_to_end(path)
+        try:
+            # mtime doubles as last access, so LRU order survives restarts
+            os.utime(path)
+        except OSError:
+            pass
+
+    def read_ref(self, ref_path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(ref_path, "rb") as f:
+                return json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def _drop_ref(self, ref: Dict[str, Any]) -> None:
+        """Delete a ref whose object was evicted"""
+        path = self._ref_path(ref["canonical_url"])
+        current = self.read_ref(path)
+        # Another process may have just pointed the ref at a new object
+        if current is None or current.get("sha256") != ref["sha256"]:
+            return
+        try:
+            os.unlink(path)
+            self.refs_dropped += 1
+        except OSError:
+            pass
+
+    def load(self, ref: Dict[str, Any]) -> Optional[Page]:
+        """Rebuild the page a ref points at, or None (dropping the ref) if its object was evicted"""
+        path = self._find_object(ref["sha256"])
+        if path is None:
+            self._drop_ref(ref)
+            return None
+        try:
+            with open(path, "rb") as f:
+                content = _decompress(f.read(), os.path.splitext(path)[1])
+        except Exception as e:
+            # Missing, corrupt, or zstd without zstandard installed
+            logger.warning(f"Unreadable snapshot {path}: {e}")
+            return None
+        self._touch(path)
+        return Page(
+            url=ref["url"],
+            status_code=200,
+            headers=httpx.Headers(ref.get("headers") or {}),
+            content=content,
+            encoding=ref.get("encoding"),
+            truncated=ref.get("truncated", False),
+            stopped_early=ref.get("stopped_early", False),
+        )
+
+    def get_sync(self, canonical_url: str, max_age: Optional[float] = None) -> Optional[Tuple[Page, Dict[str, Any]]]:
+        ref = self.read_ref(self._ref_path(canonical_url))
+        page = None
+        if ref is not None and (max_age is None or time.time() - ref["fetched_at"] <= max_age):
+            page = self.load(ref)
+        if page is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return page, ref
+
+    async def get(self, canonical_url: str, max_age: Optional[float] = None) -> Optional[Tuple[Page, Dict[str, Any]]]:
+        """
+        Latest snapshot of a URL and its ref, or None.
+
+        ``max_age`` limits how old (in seconds) a usable snapshot may be.
+        """
+        return await asyncio.to_thread(self.get_sync, canonical_url, max_age)
+
+    async def get_ref(self, canonical_url: str) -> Optional[Dict[str, Any]]:
+        """A URL's latest ref regardless of age, e.g. for its validators"""
+        return await asyncio.to_thread(self.read_ref, self._ref_path(canonical_url))
+
+    def revalidate_sync(self, ref: Dict[str, Any], headers: httpx.Headers) -> Optional[Page]:
+        page = self.load(ref)
+        if page is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # The origin confirmed the snapshot is current: restart its age and
+        # take any updated validators from the 304
+        ref = dict(ref, fetched_at=time.time())
+        ref["headers"] = dict(ref.get("headers") or {})
+        for name in ("etag", "last-modified"):
+            if name in headers:
+                ref["headers"][name] = headers[name]
+        _write_atomic(self._ref_path(ref["canonical_url"]), json.dumps(ref).encode("utf-8"))
+        return page
+
+    async def revalidate(self, ref: Dict[str, Any], headers: httpx.Headers) -> Optional[Page]:
+        """Reuse a snapshot after a 304 Not Modified, or None if it was evicted"""
+        return await asyncio.to_thread(self.revalidate_sync, ref, headers)
+
+    def put_sync(self, canonical_url: str, page: Page) -> Optional[str]:
+        if page.truncated or page.stopped_early:
+            # Re-parsing a partial page would not reflect the parser
+            self.skipped += 1
+            return None
+        digest = hashlib.sha256(page.content).hexdigest()
+        path = self._find_object(digest)
+        if path is None:
+            data, suffix = _compress(page.content)
+            path = self._object_path(digest, suffix)
+            _write_atomic(path, data)
+            with self._lock:
+                self._objects[path] = len(data)
+                self._total_bytes += len(data)
+            self.writes += 1
+        else:
+            self._touch(path)
+        ref = {
+            "canonical_url": canonical_url,
+            "url": page.url,
+            "sha256": digest,
+            "size": len(page.content),
+            "fetched_at": time.time(),
+            "encoding": page.encoding,
+            "headers": {name: page.headers[name] for name in SNAPSHOT_HEADERS if name in page.headers},
+            "truncated": page.truncated,
+            "stopped_early": page.stopped_early,
+        }
+        _write_atomic(self._ref_path(canonical_url), json.dumps(ref).encode("utf-8"))
+        self._evict()
+        return digest
+
+    async def put(self, canonical_url: str, page: Page) -> Optional[str]:
+        """Store a fetched page as the latest snapshot of a URL; returns its digest, or None if incomplete"""
+        return await asyncio.to_thread(self.put_sync, canonical_url, page)
+
+    def _evict(self) -> None:
+        if not self.max_bytes:
+            return
+        with self._lock:
+            rescan = time.monotonic() - self._indexed_at >= _RESCAN_INTERVAL
+            if rescan:
+                # Claimed under the lock so concurrent writers scan only once
+                self._indexed_at = time.monotonic()
+        if rescan:
+            self.load_index()
+        victims = []
+        with self._lock:
+            # Trim to 90% so a full store does not evict on every write
+            target = self.max_bytes * 0.9 if self._total_bytes > self.max_bytes else None
+            while target is not None and self._total_bytes > target and len(self._objects) > 1:
+                path, size = self._objects.popitem(last=False)
+                self._total_bytes -= size
+                victims.append(path)
+        for path in victims:
+            try:
+                os.unlink(path)
+                self.evictions += 1
+            except OSError:
+                pass
+        # Refs to evicted objects are dropped when next read (load, iter_refs)
+
+    def iter_refs(self) -> Iterator[Dict[str, Any]]:
+        """Every stored ref with an object, for offline re-parsing; others are dropped"""
+        for root, _, files in os.walk(self._refs_dir):
+            for name in sorted(files):
+                if name.endswith(".json"):
+                    ref = self.read_ref(os.path.join(root, name))
+                    if ref is None:
+                        continue
+                    if self._find_object(ref["sha256"]) is None:
+                        self._drop_ref(ref)
+                        continue
+                    yield ref
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "directory": self.directory,
+            "compression": "zstd" if zstandard is not None else "zlib",
+            "objects": len(self._objects),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "writes": self.writes,
+            "skipped_incomplete": self.skipped,
+            "evictions": self.evictions,
+            "refs_dropped": self.refs_dropped,
+        }
+
+
+def create_snapshot_store() -> Optional[SnapshotStore]:
+    """The snapshot store configured by ``SNAPSHOT_DIR``, or None if disabled"""
+    if not config.SNAPSHOT_DIR:
+        return None
+    return SnapshotStore()
@@ -0,0 +1,327 @@
+"""
+Storage for parsed recipes served by ``GET /recipe/{recipe_id}``.
+
+Two backends are available, selected with ``RECIPE_STORE_BACKEND``:
+
+* ``memory`` - a per-process LRU store bounded by entries and/or bytes.
+* ``sqlite`` - a file-backed store in WAL mode that every worker process on
+  the host opens, so a recipe parsed by one worker can be fetched from any
+  other and survives restarts.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+def approximate_size(recipe: BaseModel) -> int:
+    """Approximate memory cost of a recipe, using its JSON size as a proxy"""
+    return len(recipe.model_dump_json())
+
+
+def serialize_recipe(recipe: BaseModel) -> bytes:
+    """Compact on-disk form: JSON without default-valued fields, zlib-compressed"""
+    return zlib.compress(recipe.model_dump_json(exclude_defaults=True).encode("utf-8"))
+
+
+def deserialize_recipe(model: Type[BaseModel], data: bytes) -> BaseModel:
+    return model.model_validate_json(zlib.decompress(data))
+
+
+class RecipeStore:
+    """Interface shared by the recipe storage backends"""
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    def __contains__(self, recipe_id: str) -> bool:
+        return self.get(recipe_id) is not None
+
+    def get(self, recipe_id: str) -> Optional[BaseModel]:
+        raise NotImplementedError
+
+    def get_by_url(self, canonical_url: str) -> Optional[BaseModel]:
+        """The most recently stored recipe for a canonical URL (indexed lookup)"""
+        raise NotImplementedError
+
+    def put(self, recipe_id: str, recipe: BaseModel, canonical_url: Optional[str] = None) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class BoundedRecipeStore(RecipeStore):
+    """
+    In-memory recipe store with LRU eviction.
+
+    The store is bounded by entry count, by approximate bytes, or both;
+    a limit of 0 disables that bound.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = config.RECIPE_STORE_MAX_ENTRIES,
+        max_bytes: int = config.RECIPE_STORE_MAX_BYTES,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[BaseModel, int, Optional[str]]]" = OrderedDict()
+        self._by_url: Dict[str, str] = {}
+        self.total_bytes = 0
+        self.evictions = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, recipe_id: str) -> bool:
+        return recipe_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, recipe_id: str) -> Optional[BaseModel]:
+        entry = self._entries.get(recipe_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(recipe_id)
+        self.hits += 1
+        return entry[0]
+
+    def get_by_url(self, canonical_url: str) -> Optional[BaseModel]:
+        recipe_id = self._by_url.get(canonical_url)
+        if recipe_id is None:
+            self.misses += 1
+            return None
+        return self.get(recipe_id)
+
+    def put(self, recipe_id: str, recipe: BaseModel, canonical_url: Optional[str] = None) -> None:
+        size = approximate_size(recipe)
+        previous = self._entries.pop(recipe_id, None)
+        if previous is not None:
+            self.total_bytes -= previous[1]
+        self._entries[recipe_id] = (recipe, size, canonical_url)
+        self.total_bytes += size
+        if canonical_url:
+            self._by_url[canonical_url] = recipe_id
+        self._evict()
+
+    def _evict(self) -> None:
+        # Never evict the entry that was just written, even if it alone
+        # exceeds the byte budget
+        while len(self._entries) > 1 and (
+            (self.max_entries and len(self._entries) > self.max_entries)
+            or (self.max_bytes and self.total_bytes > self.max_bytes)
+        ):
+            recipe_id, (_, size, canonical_url) = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            if canonical_url and self._by_url.get(canonical_url) == recipe_id:
+                del self._by_url[canonical_url]
+            self.evictions += 1
+            logger.debug(f"Evicted recipe {recipe_id} from storage")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class SQLiteRecipeStore(RecipeStore):
+    """
+    SQLite-backed recipe store shared by all workers on a host.
+
+    Writes are buffered and flushed in batches from a background thread, on
+    a separate connection from reads; WAL mode lets readers in every process
+    proceed while a batch commits. Pending writes are visible to reads in the
+    process that made them straight away and to other processes once flushed.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS recipes (
+            id TEXT PRIMARY KEY,
+            canonical_url TEXT,
+            data BLOB NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_recipes_canonical_url
+            ON recipes (canonical_url, updated_at);
+    """
+
+    def __init__(
+        self,
+        model: Type[BaseModel],
+        path: str = config.RECIPE_STORE_PATH,
+        batch_size: int = config.RECIPE_STORE_BATCH_SIZE,
+        flush_interval: float = config.RECIPE_STORE_FLUSH_INTERVAL,
+    ):
+        self.model = model
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._reader = self._connect()
+        self._writer = self._connect()
+        self._writer.executescript(self.SCHEMA)
+        self._write_lock = threading.Lock()
+        self._pending: "OrderedDict[str, Tuple[BaseModel, Optional[str], float]]" = OrderedDict()
+        self._pending_by_url: Dict[str, str] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.flushes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    async def start(self) -> None:
+        if self._flush_task is None:
+            self._wakeup = asyncio.Event()
+            self._flush_task = asyncio.create_task(self._flush_loop())
+            logger.info(f"SQLite recipe store opened at {self.path}")
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+        self._reader.close()
+        self._writer.close()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Failed to write recipes to SQLite: {e}")
+
+    async def flush(self) -> None:
+        """Write all pending recipes in one transaction"""
+        batch = list(self._pending.items())
+        if not batch:
+            return
+        await asyncio.to_thread(self._write_batch, batch)
+        # Entries stay readable from memory until committed; drop only the
+        # ones that were not overwritten while the batch was being written
+        for recipe_id, entry in batch:
+            if self._pending.get(recipe_id) is entry:
+                del self._pending[recipe_id]
+                canonical_url = entry[1]
+                if canonical_url and self._pending_by_url.get(canonical_url) == recipe_id:
+                    del self._pending_by_url[canonical_url]
+
+    def _write_batch(self, batch: List[Tuple[str, Tuple[BaseModel, Optional[str], float]]]) -> None:
+        rows = [
+            (recipe_id, canonical_url, serialize_recipe(recipe), updated_at)
+            for recipe_id, (recipe, canonical_url, updated_at) in batch
+        ]
+        with self._write_lock:
+            self._writer.execute("BEGIN")
+            try:
+                self._writer.executemany(
+                    "INSERT INTO recipes (id, canonical_url, data, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET canonical_url = excluded.canonical_url, "
+                    "data = excluded.data, updated_at = excluded.updated_at",
+                    rows,
+                )
+                self._writer.execute("COMMIT")
+            except Exception:
+                self._writer.execute("ROLLBACK")
+                raise
+        self.writes += len(rows)
+        self.flushes += 1
+
+    def get(self, recipe_id: str) -> Optional[BaseModel]:
+        pending = self._pending.get(recipe_id)
+        if pending is not None:
+            self.hits += 1
+            return pending[0]
+        row = self._reader.execute("SELECT data FROM recipes WHERE id = ?", (recipe_id,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return deserialize_recipe(self.model, row[0])
+
+    def __contains__(self, recipe_id: str) -> bool:
+        # An existence check only; no need to load and validate the recipe
+        if recipe_id in self._pending:
+            return True
+        return self._reader.execute("SELECT 1 FROM recipes WHERE id = ?", (recipe_id,)).fetchone() is not None
+
+    def get_by_url(self, canonical_url: str) -> Optional[BaseModel]:
+        recipe_id = self._pending_by_url.get(canonical_url)
+        if recipe_id is not None:
+            return self.get(recipe_id)
+        row = self._reader.execute(
+            "SELECT data FROM recipes WHERE canonical_url = ? ORDER BY updated_at DESC LIMIT 1",
+            (canonical_url,),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return deserialize_recipe(self.model, row[0])
+
+    def put(self, recipe_id: str, recipe: BaseModel, canonical_url: Optional[str] = None) -> None:
+        self._pending[recipe_id] = (recipe, canonical_url, time.time())
+        if canonical_url:
+            self._pending_by_url[canonical_url] = recipe_id
+        if self._wakeup is not None and len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._reader.execute("SELECT COUNT(*) FROM recipes").fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "entries": entries,
+            "pending_writes": len(self._pending),
+            "writes": self.writes,
+            "flushes": self.flushes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def create_recipe_store(model: Type[BaseModel]) -> RecipeStore:
+    """Build the recipe store selected by ``RECIPE_STORE_BACKEND``"""
+    if config.RECIPE_STORE_BACKEND == "sqlite":
+        return SQLiteRecipeStore(model)
+    if config.RECIPE_STORE_BACKEND != "memory":
+        raise ValueError(f"Unknown RECIPE_STORE_BACKEND: {config.RECIPE_STORE_BACKEND}")
+    return BoundedRecipeStore()
@@ -6,7 +6,8 @@ Test script for the Dishly.pro Recipe Parser API
 import requests
 import json
 import sys
-from typing import Dict, Any
+import time
+from typing import Dict, Any, List
 
 def test_health_endpoint(base_url: str) -> bool:
     """Test the health endpoint"""
@@ -70,6 +71,66 @@ def test_parse_endpoint(base_url: str, test_url: str) -> bool:
         print(f"❌ Parse endpoint error: {e}")
         return False
 
+def test_batch_endpoint(base_url: str, test_urls: List[str]) -> bool:
+    """Test the batch parse endpoint with several recipe URLs"""
+    try:
+        payload = {"urls": test_urls}
+        response = requests.post(
+            f"{base_url}/parse/batch",
+            json=payload,
+            headers={"Content-Type": "application/json"}
+        )
+        
+        if response.status_code == 200:
+            data = response.json()
+            print("✅ Batch endpoint working")
+            print(f"   Succeeded: {data.get('succeeded', 0)}/{len(test_urls)}")
+            for item in data.get("results", []):
+                if item.get("error"):
+                    print(f"   ⚠️  {item['url']}: {item['error']}")
+                else:
+                    print(f"   ✅ {item['url']}: {item.get('recipe', {}).get('title', 'No title')}")
+            return True
+        else:
+            print(f"❌ Batch endpoint failed: {response.status_code}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Batch endpoint error: {e}")
+        return False
+
+def test_async_job(base_url: str, test_url: str, timeout: float = 60.0) -> bool:
+    """Test async parsing: queue a job and poll it until it finishes"""
+    try:
+        response = requests.post(
+            f"{base_url}/parse?async=true",
+            json={"url": test_url},
+            headers={"Content-Type": "application/json"}
+        )
+        if response.status_code != 202:
+            print(f"❌ Async parse failed: {response.status_code}")
+            return False
+        
+        job_id = response.json()["job_id"]
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            job = requests.get(f"{base_url}/jobs/{job_id}").json()
+            if job.get("status") == "done":
+                print("✅ Async job working")
+                print(f"   Recipe: {job['result']['recipe'].get('title', 'No title')}")
+                return True
+            if job.get("status") == "failed":
+                print(f"⚠️  Async job failed: {job.get('error')}")
+                return False
+            time.sleep(1)
+        
+        print(f"❌ Async job {job_id} did not finish within {timeout:.0f}s")
+        return False
+        
+    except Exception as e:
+        print(f"❌ Async job error: {e}")
+        return False
+
 def main():
     """Run all tests"""
     base_url = "http://localhost:8000"
@@ -107,9 +168,17 @@ def main():
         print("\n⚠️  Parse endpoint failed with all test URLs.")
         print("   This might be due to network issues or website changes.")
     
+    print(f"\n🔍 Testing batch parse with {len(test_urls)} URLs")
+    test_batch_endpoint(base_url, test_urls)
+    
+    print("\n🔍 Testing async parse job")
+    test_async_job(base_url, test_urls[0])
+    
     print("\n📋 API Endpoints:")
     print(f"   Health: {base_url}/health")
     print(f"   Parse:  {base_url}/parse")
+    print(f"   Batch:  {base_url}/parse/batch")
+    print(f"   Jobs:   {base_url}/jobs/{{job_id}}")
     print(f"   Docs:   {base_url}/docs")
 
 if __name__ == "__main__":